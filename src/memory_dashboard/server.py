@@ -20,15 +20,95 @@ import mcp.types as types
 from mcp.server import NotificationOptions, Server
 import mcp.server.stdio
 import chromadb
+from chromadb.utils import embedding_functions
+import numpy as np
 import os
 import json
 import uuid
 import time
 import shutil
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from collections import deque
+from collections import deque, Counter, OrderedDict
+from array import array
 import threading
+import functools
+import abc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import logging
+import logging.handlers
+import random
+import sys
+import hashlib
+import heapq
+import bisect
+import re
+import base64
+import math
+import sqlite3
+try:
+    import fcntl
+except ImportError:  # Windows: the embedding store falls back to in-process locking
+    fcntl = None
+
+# Logging configuration. stdout is the MCP stdio transport, so logs go to
+# stderr (or a rotating file) as JSON lines and never interleave with JSON-RPC frames.
+LOG_LEVEL = os.environ.get("MCP_MEMORY_LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.environ.get("MCP_MEMORY_LOG_FILE")
+LOG_FILE_MAX_BYTES = int(os.environ.get("MCP_MEMORY_LOG_FILE_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_FILE_BACKUP_COUNT = int(os.environ.get("MCP_MEMORY_LOG_FILE_BACKUP_COUNT", "3"))
+# Fraction of high-frequency events (e.g. cache tracing) that are actually written
+LOG_SAMPLE_RATE = float(os.environ.get("MCP_MEMORY_LOG_SAMPLE_RATE", "0.1"))
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format each record as a single JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage()
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of records logged with extra=SAMPLED"""
+
+    def __init__(self, sample_rate):
+        super().__init__()
+        self.sample_rate = sample_rate
+
+    def filter(self, record):
+        if getattr(record, "sampled", False) and self.sample_rate < 1.0:
+            return random.random() < self.sample_rate
+        return True
+
+# Shared extra for high-frequency events; a constant so disabled calls allocate nothing
+SAMPLED = {"sampled": True}
+
+def configure_logging():
+    configured_logger = logging.getLogger("memory_dashboard")
+    configured_logger.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+    configured_logger.propagate = False
+    if LOG_FILE:
+        handler = logging.handlers.RotatingFileHandler(
+            LOG_FILE, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUP_COUNT, encoding="utf-8"
+        )
+    else:
+        handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonLinesFormatter())
+    configured_logger.handlers = [handler]
+    configured_logger.filters = [SamplingFilter(LOG_SAMPLE_RATE)]
+    return configured_logger
+
+logger = configure_logging()
 
 # Initialize the server
 server = Server("memory-dashboard")
@@ -52,156 +132,2333 @@ client = chromadb.PersistentClient(path=CHROMA_PATH)
 # Let's name the collection something like "memories" or "mcp_memories".
 # This collection name should ideally be configurable or a constant.
 COLLECTION_NAME = "mcp_memories"
+
+# Explicit (default) embedding function so query embeddings can be computed and memoized here
+embedding_function = embedding_functions.DefaultEmbeddingFunction()
+
+# HNSW index parameters, applied when the collection is created (and by dashboard_migrate_collection)
+HNSW_DEFAULTS = {"hnsw:space": "l2", "hnsw:M": 16, "hnsw:construction_ef": 100, "hnsw:search_ef": 10}
+HNSW_SPACES = ("l2", "cosine", "ip")
+
+def parse_hnsw_settings(settings):
+    """Validate space / M / construction_ef / search_ef settings and return them as collection metadata"""
+    metadata = {}
+    for key, value in settings.items():
+        if value is None or value == "":
+            continue
+        if key == "space":
+            if value not in HNSW_SPACES:
+                raise ValueError(f"HNSW space must be one of {list(HNSW_SPACES)}")
+            metadata["hnsw:space"] = value
+        elif key in ("M", "construction_ef", "search_ef"):
+            if int(value) <= 0:
+                raise ValueError(f"HNSW {key} must be a positive integer")
+            metadata[f"hnsw:{key}"] = int(value)
+        else:
+            raise ValueError(f"Unknown HNSW setting '{key}'")
+    return metadata
+
+def get_hnsw_settings(target_collection):
+    """Effective HNSW settings of a collection (Chroma defaults for anything not set)"""
+    metadata = target_collection.metadata or {}
+    return {key.split(":", 1)[1]: metadata.get(key, default) for key, default in HNSW_DEFAULTS.items()}
+
+HNSW_METADATA = parse_hnsw_settings({
+    "space": os.environ.get("MCP_MEMORY_HNSW_SPACE"),
+    "M": os.environ.get("MCP_MEMORY_HNSW_M"),
+    "construction_ef": os.environ.get("MCP_MEMORY_HNSW_CONSTRUCTION_EF"),
+    "search_ef": os.environ.get("MCP_MEMORY_HNSW_SEARCH_EF")
+})
+MIGRATION_COLLECTION_NAME = f"{COLLECTION_NAME}_migration"
+
+def open_collection():
+    """Open the memories collection, creating it with the configured HNSW settings if needed"""
+    try:
+        existing = client.get_collection(name=COLLECTION_NAME, embedding_function=embedding_function)
+    except Exception:
+        existing = None
+
+    if existing is None:
+        # A migration that was interrupted after the old collection was dropped
+        try:
+            interrupted = client.get_collection(name=MIGRATION_COLLECTION_NAME, embedding_function=embedding_function)
+        except Exception:
+            interrupted = None
+        if interrupted is not None:
+            logger.warning("Completing interrupted collection migration from '%s'", MIGRATION_COLLECTION_NAME)
+            interrupted.modify(name=COLLECTION_NAME)
+            return interrupted
+        return client.create_collection(name=COLLECTION_NAME, embedding_function=embedding_function, metadata=HNSW_METADATA or None)
+
+    # get_or_create_collection would overwrite the metadata without rebuilding the index,
+    # so differing settings on an existing collection are only reported
+    pending = {key: value for key, value in HNSW_METADATA.items() if (existing.metadata or {}).get(key, HNSW_DEFAULTS[key]) != value}
+    if pending:
+        logger.warning("Collection HNSW settings differ from configuration %s; run dashboard_migrate_collection to apply them", pending)
+    return existing
+
 try:
-    collection = client.get_or_create_collection(name=COLLECTION_NAME)
+    collection = open_collection()
 except Exception as e:
     # Handle potential errors during collection creation/retrieval
     # For now, we can re-raise or log, but this indicates a setup issue.
     raise ValueError(f"Failed to get or create ChromaDB collection '{COLLECTION_NAME}': {e}")
 
-# PERFORMANCE OPTIMIZATION: Stats caching
-class StatsCache:
-    def __init__(self, ttl_seconds=30):
-        self.ttl_seconds = ttl_seconds
-        self.cache = {}
-        self.last_updated = {}
+# Tag index path configuration (kept next to the ChromaDB directory, like backups)
+TAG_INDEX_PATH = os.environ.get("MCP_MEMORY_TAG_INDEX_PATH", os.path.join(os.path.dirname(CHROMA_PATH), "tag_index.json"))
+
+# Unique tag counting: "exact" keeps a full tag index, "hll" a bounded-memory HyperLogLog sketch
+UNIQUE_TAGS_MODE = os.environ.get("MCP_MEMORY_UNIQUE_TAGS_MODE", "exact").lower()
+HLL_PRECISION = int(os.environ.get("MCP_MEMORY_HLL_PRECISION", "12"))
+TAG_SKETCH_PATH = os.environ.get("MCP_MEMORY_TAG_SKETCH_PATH", os.path.join(os.path.dirname(CHROMA_PATH), "tag_sketch.json"))
+
+# Per-day memory count index used for timelines
+TIMELINE_INDEX_PATH = os.environ.get("MCP_MEMORY_TIMELINE_INDEX_PATH", os.path.join(os.path.dirname(CHROMA_PATH), "timeline_index.json"))
+
+# Page size for streaming scans over the whole collection
+SCAN_PAGE_SIZE = int(os.environ.get("MCP_MEMORY_SCAN_PAGE_SIZE", "500"))
+
+def iter_collection_pages(collection, include=None, page_size=None):
+    """Yield the collection as fixed-size pages using limit/offset.
+
+    Only one page is held in memory at a time. include is passed straight to
+    collection.get, so an empty list fetches IDs only.
+    """
+    page_size = page_size or SCAN_PAGE_SIZE
+    offset = 0
+    while True:
+        page = collection.get(
+            include=include if include is not None else [],
+            limit=page_size,
+            offset=offset
+        )
+        page_ids = page.get('ids') or []
+        if not page_ids:
+            return
+        yield page
+        if len(page_ids) < page_size:
+            return
+        offset += len(page_ids)
+
+def scan_collection(collection, visit_page, include=None, page_size=None):
+    """Stream the collection page by page through visit_page and return scan metrics"""
+    start_time = time.time()
+    rows = 0
+    pages = 0
+    for page in iter_collection_pages(collection, include=include, page_size=page_size):
+        visit_page(page)
+        rows += len(page['ids'])
+        pages += 1
+    elapsed = time.time() - start_time
+    return {
+        "rows": rows,
+        "pages": pages,
+        "page_size": page_size or SCAN_PAGE_SIZE,
+        "elapsed_ms": round(elapsed * 1000, 1),
+        "rows_per_sec": round(rows / elapsed, 1) if elapsed > 0 else None
+    }
+
+def get_memory_tags(metadata):
+    """Return the tags stored in a memory's metadata, or an empty list.
+
+    Tags are either a list or, as Chroma stores them, a JSON array string.
+    Only string items count, matching the json_each() rule in
+    get_stats_from_sqlite so both stats paths agree on what a tag is.
+    """
+    tags = metadata.get("tags") if metadata else None
+    if isinstance(tags, str):
+        try:
+            tags = json.loads(tags)
+        except ValueError:
+            return []
+    if not isinstance(tags, list):
+        return []
+    return list(dict.fromkeys(tag for tag in tags if isinstance(tag, str)))
+
+def timestamp_to_epoch(value):
+    """Seconds since the epoch for a stored timestamp (number or ISO 8601 string), or None.
+
+    Naive ISO timestamps are UTC, which is what store_memory writes.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+def get_memory_day(metadata):
+    """Return the UTC day (YYYY-MM-DD) a memory was stored on, or None if unknown"""
+    epoch = timestamp_to_epoch(metadata.get("timestamp")) if metadata else None
+    if epoch is None:
+        return None
+    try:
+        return datetime.fromtimestamp(epoch, timezone.utc).strftime("%Y-%m-%d")
+    except (OverflowError, OSError, ValueError):
+        return None
+
+# PERFORMANCE OPTIMIZATION: Persistent count indexes
+# Writes are appended to a journal; the JSON snapshot is only rewritten every N journal entries
+INDEX_COMPACT_EVERY = int(os.environ.get("MCP_MEMORY_INDEX_COMPACT_EVERY", "500"))
+
+class CountIndex(abc.ABC):
+    """Exact key -> memory count index, updated on every write and persisted as JSON.
+
+    Subclasses define which keys a memory contributes via keys_for_memory().
+    The index records the number of memories it has seen so a mismatch with
+    collection.count() marks it as stale and triggers a rebuild from scratch.
+
+    Each write appends one line to <path>.journal instead of rewriting the
+    snapshot; load() replays the journal on top of the snapshot and the two
+    are compacted every INDEX_COMPACT_EVERY entries. Snapshot and journal
+    lines carry a generation number, so journal lines that were already
+    folded into a snapshot are never applied twice.
+    """
+    VERSION = 1
+    label = "Count index"
+
+    def __init__(self, path):
+        self.path = path
+        self.journal_path = f"{path}.journal"
+        self.counts = {}
+        self.total_memories = 0
+        self.generation = 0
+        self.journal_entries = 0
+        self.loaded = False
+        self.last_scan = None
         self.lock = threading.Lock()
-        
-    def get(self, key):
+
+    @abc.abstractmethod
+    def keys_for_memory(self, metadata):
+        """Keys the memory with this metadata is counted under"""
+
+    def load(self):
+        """Load the index from disk. Returns False if it is missing or unreadable."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != self.VERSION:
+                logger.warning("%s version mismatch, ignoring %s", self.label, self.path)
+                return False
+            counts = {str(key): int(count) for key, count in data["counts"].items()}
+            total_memories = int(data["total_memories"])
+            generation = int(data.get("generation", 0))
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.error("Failed to load %s from %s: %s", self.label.lower(), self.path, e)
+            return False
+
         with self.lock:
-            if key in self.cache:
-                if datetime.now() - self.last_updated[key] < timedelta(seconds=self.ttl_seconds):
-                    print(f"📊 Cache HIT for {key} (age: {(datetime.now() - self.last_updated[key]).seconds}s)")
-                    return self.cache[key]
+            self.counts = counts
+            self.total_memories = total_memories
+            self.generation = generation
+            self.journal_entries = self._replay_journal_locked()
+            self.loaded = True
+        logger.info("%s loaded: %s keys, %s memories (%s journal entries)", self.label, len(self.counts), self.total_memories, self.journal_entries)
+        return True
+
+    def _replay_journal_locked(self):
+        replayed = 0
+        try:
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # torn last line after a crash
+                    if entry.get("g") != self.generation:
+                        continue
+                    self._apply_locked(entry["op"], entry["keys"], entry["memories"])
+                    replayed += 1
+        except FileNotFoundError:
+            pass
+        except (OSError, KeyError, TypeError) as e:
+            logger.error("Failed to replay %s journal %s: %s", self.label.lower(), self.journal_path, e)
+        return replayed
+
+    def _apply_locked(self, op, keys, memories):
+        """Apply an add/remove to the in-memory counts; returns the number of keys created or dropped"""
+        changed_keys = 0
+        if op == "add":
+            for key in keys:
+                if key not in self.counts:
+                    changed_keys += 1
+                self.counts[key] = self.counts.get(key, 0) + 1
+            self.total_memories += memories
+        else:
+            for key in keys:
+                remaining = self.counts.get(key, 0) - 1
+                if remaining > 0:
+                    self.counts[key] = remaining
+                elif self.counts.pop(key, None) is not None:
+                    changed_keys += 1
+            self.total_memories = max(0, self.total_memories - memories)
+        return changed_keys
+
+    def _journal_locked(self, op, keys, memories):
+        self.journal_entries += 1
+        if self.journal_entries >= INDEX_COMPACT_EVERY:
+            self._save_locked()
+            return
+        try:
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"g": self.generation, "op": op, "keys": keys, "memories": memories}) + "\n")
+        except OSError as e:
+            logger.error("Failed to append to %s journal %s: %s", self.label.lower(), self.journal_path, e)
+
+    def _save_locked(self):
+        """Write a fresh snapshot under a new generation and empty the journal"""
+        self.generation += 1
+        # Write to a temp file and rename so a crash never leaves a truncated index
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "version": self.VERSION,
+                    "generation": self.generation,
+                    "total_memories": self.total_memories,
+                    "counts": self.counts
+                }, f)
+            os.replace(tmp_path, self.path)
+            # Lines of the previous generation are ignored on load, so a crash before this is harmless
+            open(self.journal_path, "w", encoding="utf-8").close()
+            self.journal_entries = 0
+        except OSError as e:
+            logger.error("Failed to persist %s to %s: %s", self.label.lower(), self.path, e)
+
+    def rebuild(self, collection):
+        """Rebuild the index from scratch with a paginated metadata scan"""
+        counts = {}
+
+        def count_page(page):
+            for meta in page.get('metadatas') or []:
+                for key in self.keys_for_memory(meta):
+                    counts[key] = counts.get(key, 0) + 1
+
+        scan = scan_collection(collection, count_page, include=['metadatas'])
+
+        with self.lock:
+            self.counts = counts
+            self.total_memories = scan["rows"]
+            self.loaded = True
+            self.last_scan = scan
+            self._save_locked()
+
+        logger.info("%s rebuilt: %s keys, %s memories in %sms (%s rows/sec)", self.label, len(counts), scan['rows'], scan['elapsed_ms'], scan['rows_per_sec'], extra={"fields": {"scan": scan}})
+
+    def ensure_fresh(self, collection, total_memories=None):
+        """Load the index, rebuilding it if it is missing or out of sync with the collection.
+
+        Returns True if a rebuild scan ran.
+        """
+        if total_memories is None:
+            total_memories = collection.count()
+        if not self.loaded:
+            self.load()
+        if not self.loaded or self.total_memories != total_memories:
+            logger.info("%s stale (indexed %s, collection has %s), rebuilding", self.label, self.total_memories, total_memories)
+            self.rebuild(collection)
+            return True
+        return False
+
+    def add_memory(self, metadata):
+        """Record a newly stored memory.
+
+        Returns the number of keys seen for the first time, or None if the
+        index is not loaded yet.
+        """
+        with self.lock:
+            if not self.loaded:
+                return None
+            keys = list(self.keys_for_memory(metadata))
+            new_keys = self._apply_locked("add", keys, 1)
+            self._journal_locked("add", keys, 1)
+            return new_keys
+
+    def remove_memories(self, metadatas):
+        """Record deleted memories, given the metadata of each deleted memory.
+
+        Returns the number of keys that no longer have any memory, or None if
+        the index is not loaded yet.
+        """
+        with self.lock:
+            if not self.loaded:
+                return None
+            keys = [key for metadata in metadatas for key in self.keys_for_memory(metadata)]
+            dropped_keys = self._apply_locked("remove", keys, len(metadatas))
+            self._journal_locked("remove", keys, len(metadatas))
+            return dropped_keys
+
+    def flush(self):
+        """Fold the journal into the snapshot (called on shutdown)"""
+        with self.lock:
+            if self.loaded and self.journal_entries:
+                self._save_locked()
+
+    def get_counts(self):
+        with self.lock:
+            return dict(self.counts)
+
+class TagIndex(CountIndex):
+    """Exact tag -> memory count index"""
+    label = "Tag index"
+
+    def keys_for_memory(self, metadata):
+        return set(get_memory_tags(metadata))
+
+    def unique_tags(self):
+        with self.lock:
+            return len(self.counts)
+
+    def snapshot(self):
+        """Return (total_memories, unique_tags), or None if the index is not loaded"""
+        with self.lock:
+            if not self.loaded:
+                return None
+            return self.total_memories, len(self.counts)
+
+    def describe(self):
+        """Extra stats fields describing how unique_tags was computed"""
+        return {"unique_tags_method": "exact"}
+
+class TimelineIndex(CountIndex):
+    """Exact day (YYYY-MM-DD) -> memory count index for dashboard timelines"""
+    label = "Timeline index"
+
+    def keys_for_memory(self, metadata):
+        day = get_memory_day(metadata)
+        return [day] if day else []
+
+    def range_counts(self, start_day=None, end_day=None, granularity="day"):
+        """Memory counts per day, ISO week (keyed by its Monday) or month between two days, inclusive.
+
+        Empty periods are included with a count of zero so timelines need no
+        client-side gap filling. Missing bounds default to the first/last
+        indexed day.
+        """
+        if granularity not in ("day", "week", "month"):
+            raise ValueError(f"Unsupported granularity '{granularity}', expected day, week or month")
+
+        with self.lock:
+            days = sorted(self.counts)
+            start_day = start_day or (days[0] if days else None)
+            end_day = end_day or (days[-1] if days else None)
+            if not start_day or not end_day:
+                return []
+            start = datetime.strptime(start_day, "%Y-%m-%d").date()
+            end = datetime.strptime(end_day, "%Y-%m-%d").date()
+            if start > end:
+                raise ValueError(f"start_date {start_day} is after end_date {end_day}")
+
+            def bucket_start(day):
+                if granularity == "week":
+                    return day - timedelta(days=day.weekday())
+                if granularity == "month":
+                    return day.replace(day=1)
+                return day
+
+            buckets = OrderedDict()
+            current = bucket_start(start)
+            while current <= end:
+                buckets[current.isoformat()] = 0
+                if granularity == "day":
+                    current += timedelta(days=1)
+                elif granularity == "week":
+                    current += timedelta(weeks=1)
                 else:
-                    print(f"📊 Cache EXPIRED for {key}")
-                    del self.cache[key]
-                    del self.last_updated[key]
-            print(f"📊 Cache MISS for {key}")
+                    current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+            for day_key in days:
+                day = datetime.strptime(day_key, "%Y-%m-%d").date()
+                if start <= day <= end:
+                    buckets[bucket_start(day).isoformat()] += self.counts[day_key]
+
+        period_format = "%Y-%m" if granularity == "month" else "%Y-%m-%d"
+        return [
+            {"period": datetime.strptime(period, "%Y-%m-%d").strftime(period_format), "count": count}
+            for period, count in buckets.items()
+        ]
+
+class HyperLogLog:
+    """Mergeable HyperLogLog sketch for approximate distinct counts.
+
+    Uses 2^precision one-byte registers and a 64-bit hash, so the relative
+    standard error is 1.04 / sqrt(2^precision) (about 1.6% at precision 12).
+    """
+
+    def __init__(self, precision=12):
+        if not 4 <= precision <= 16:
+            raise ValueError(f"HyperLogLog precision must be between 4 and 16, got {precision}")
+        self.precision = precision
+        self.num_registers = 1 << precision
+        self.registers = bytearray(self.num_registers)
+
+    def add(self, value):
+        """Add a value. Returns True if a register was raised, i.e. the estimate may have changed."""
+        hashed = int.from_bytes(hashlib.blake2b(str(value).encode("utf-8"), digest_size=8).digest(), "big")
+        index = hashed >> (64 - self.precision)
+        remaining_bits = 64 - self.precision
+        remainder = hashed & ((1 << remaining_bits) - 1)
+        rank = remaining_bits - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def merge(self, other):
+        """Merge another sketch (e.g. from another page or collection) into this one"""
+        if other.precision != self.precision:
+            raise ValueError(f"Cannot merge HyperLogLog sketches with precision {self.precision} and {other.precision}")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def estimate(self):
+        m = self.num_registers
+        if m == 16:
+            alpha = 0.673
+        elif m == 32:
+            alpha = 0.697
+        elif m == 64:
+            alpha = 0.709
+        else:
+            alpha = 0.7213 / (1 + 1.079 / m)
+
+        raw_estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        # Small-range correction (linear counting); the 64-bit hash needs no large-range correction
+        if raw_estimate <= 2.5 * m:
+            empty_registers = self.registers.count(0)
+            if empty_registers:
+                return int(round(m * math.log(m / empty_registers)))
+        return int(round(raw_estimate))
+
+    @property
+    def relative_error(self):
+        return 1.04 / math.sqrt(self.num_registers)
+
+    def to_dict(self):
+        return {
+            "precision": self.precision,
+            "registers": base64.b64encode(bytes(self.registers)).decode("ascii")
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(int(data["precision"]))
+        registers = base64.b64decode(data["registers"])
+        if len(registers) != sketch.num_registers:
+            raise ValueError("HyperLogLog register count does not match precision")
+        sketch.registers = bytearray(registers)
+        return sketch
+
+# PERFORMANCE OPTIMIZATION: Bounded-memory unique tag estimate
+class TagSketch:
+    """HyperLogLog-based drop-in for TagIndex when only the unique tag count is needed.
+
+    Memory is fixed at 2^precision bytes regardless of the number of tags.
+    Writes only mark the sketch dirty; it is persisted every INDEX_COMPACT_EVERY
+    writes and on flush(). A sketch lost in a crash is caught by the memory
+    count check in ensure_fresh() and rebuilt. Deletes cannot be removed from a sketch, so the estimate may overcount
+    until the next rebuild, which happens once deletes since the last
+    rebuild exceed REBUILD_DELETE_RATIO of the collection.
+    """
+    VERSION = 1
+    REBUILD_DELETE_RATIO = 0.1
+
+    def __init__(self, path, precision):
+        self.path = path
+        self.precision = precision
+        self.sketch = HyperLogLog(precision)
+        self.total_memories = 0
+        self.deleted_since_rebuild = 0
+        self.estimate = 0
+        self.unsaved_writes = 0
+        self.loaded = False
+        self.last_scan = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Load the sketch from disk. Returns False if it is missing, unreadable or uses another precision."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != self.VERSION:
+                logger.warning("Tag sketch version mismatch, ignoring %s", self.path)
+                return False
+            sketch = HyperLogLog.from_dict(data["sketch"])
+            if sketch.precision != self.precision:
+                logger.warning("Tag sketch precision changed (%s -> %s), ignoring %s", sketch.precision, self.precision, self.path)
+                return False
+            total_memories = int(data["total_memories"])
+            deleted_since_rebuild = int(data.get("deleted_since_rebuild", 0))
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.error("Failed to load tag sketch from %s: %s", self.path, e)
+            return False
+
+        with self.lock:
+            self.sketch = sketch
+            self.total_memories = total_memories
+            self.deleted_since_rebuild = deleted_since_rebuild
+            self.estimate = sketch.estimate()
+            self.unsaved_writes = 0
+            self.loaded = True
+        logger.info("Tag sketch loaded: ~%s tags, %s memories", self.estimate, total_memories)
+        return True
+
+    def _save_locked(self):
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "version": self.VERSION,
+                    "total_memories": self.total_memories,
+                    "deleted_since_rebuild": self.deleted_since_rebuild,
+                    "sketch": self.sketch.to_dict()
+                }, f)
+            os.replace(tmp_path, self.path)
+            self.unsaved_writes = 0
+        except OSError as e:
+            logger.error("Failed to persist tag sketch to %s: %s", self.path, e)
+
+    def rebuild(self, collection):
+        """Rebuild the sketch with a paginated scan, merging one sketch per page"""
+        sketch = HyperLogLog(self.precision)
+
+        def sketch_page(page):
+            page_sketch = HyperLogLog(self.precision)
+            for meta in page.get('metadatas') or []:
+                for tag in get_memory_tags(meta):
+                    page_sketch.add(tag)
+            sketch.merge(page_sketch)
+
+        scan = scan_collection(collection, sketch_page, include=['metadatas'])
+
+        with self.lock:
+            self.sketch = sketch
+            self.total_memories = scan["rows"]
+            self.deleted_since_rebuild = 0
+            self.estimate = sketch.estimate()
+            self.loaded = True
+            self.last_scan = scan
+            self._save_locked()
+
+        logger.info("Tag sketch rebuilt: ~%s tags, %s memories in %sms (%s rows/sec)", self.estimate, scan['rows'], scan['elapsed_ms'], scan['rows_per_sec'], extra={"fields": {"scan": scan}})
+
+    def ensure_fresh(self, collection, total_memories=None):
+        """Load the sketch, rebuilding it if missing, out of sync or inflated by deletes.
+
+        Returns True if a rebuild scan ran.
+        """
+        if total_memories is None:
+            total_memories = collection.count()
+        if not self.loaded:
+            self.load()
+        if not self.loaded or self.total_memories != total_memories:
+            logger.info("Tag sketch stale (indexed %s, collection has %s), rebuilding", self.total_memories, total_memories)
+            self.rebuild(collection)
+            return True
+        if self.deleted_since_rebuild > self.REBUILD_DELETE_RATIO * max(total_memories, 1):
+            logger.info("Tag sketch has %s deletes since last rebuild, rebuilding", self.deleted_since_rebuild)
+            self.rebuild(collection)
+            return True
+        return False
+
+    def add_memory(self, metadata):
+        """Record a newly stored memory. Returns the change in the unique tag estimate."""
+        with self.lock:
+            if not self.loaded:
+                return None
+            raised = False
+            for tag in get_memory_tags(metadata):
+                raised = self.sketch.add(tag) or raised
+            self.total_memories += 1
+            delta = 0
+            # The estimate only moves when a register does, so skip the full register pass otherwise
+            if raised:
+                estimate = self.sketch.estimate()
+                delta = estimate - self.estimate
+                self.estimate = estimate
+            self._mark_dirty_locked()
+            return delta
+
+    def remove_memories(self, metadatas):
+        """Record deleted memories. The sketch cannot forget tags, so the estimate is unchanged."""
+        with self.lock:
+            if not self.loaded:
+                return None
+            self.total_memories = max(0, self.total_memories - len(metadatas))
+            self.deleted_since_rebuild += len(metadatas)
+            self._mark_dirty_locked()
+            return 0
+
+    def _mark_dirty_locked(self):
+        self.unsaved_writes += 1
+        if self.unsaved_writes >= INDEX_COMPACT_EVERY:
+            self._save_locked()
+
+    def flush(self):
+        """Persist writes made since the last save (called on shutdown)"""
+        with self.lock:
+            if self.loaded and self.unsaved_writes:
+                self._save_locked()
+
+    def unique_tags(self):
+        with self.lock:
+            return self.estimate
+
+    def snapshot(self):
+        """Return (total_memories, unique_tags), or None if the sketch is not loaded"""
+        with self.lock:
+            if not self.loaded:
+                return None
+            return self.total_memories, self.estimate
+
+    def get_counts(self):
+        raise ValueError("Per-tag counts are not available when MCP_MEMORY_UNIQUE_TAGS_MODE=hll")
+
+    def describe(self):
+        """Extra stats fields describing how unique_tags was computed"""
+        with self.lock:
+            return {
+                "unique_tags_method": "hyperloglog",
+                "unique_tags_precision": self.precision,
+                "unique_tags_error": round(self.sketch.relative_error, 4),
+                "deleted_since_rebuild": self.deleted_since_rebuild
+            }
+
+if UNIQUE_TAGS_MODE == "hll":
+    tag_index = TagSketch(TAG_SKETCH_PATH, HLL_PRECISION)
+else:
+    tag_index = TagIndex(TAG_INDEX_PATH)
+tag_index.load()
+
+timeline_index = TimelineIndex(TIMELINE_INDEX_PATH)
+timeline_index.load()
+
+# PERFORMANCE OPTIMIZATION: In-process BM25 index for lexical and hybrid retrieval
+LEXICAL_TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text):
+    """Lowercased word tokens; identifiers like snake_case names stay whole"""
+    return LEXICAL_TOKEN_PATTERN.findall((text or "").lower())
+
+class LexicalIndex:
+    """Inverted index over memory documents with BM25 scoring.
+
+    Built lazily from a paginated document scan on first use and kept
+    current by the store/delete hooks. Like the count indexes, it is
+    rebuilt when the number of indexed documents no longer matches
+    collection.count().
+    """
+    label = "Lexical index"
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}  # term -> {memory_id: term frequency}
+        self.doc_terms = {}  # memory_id -> {term: term frequency}
+        self.doc_lengths = {}
+        self.total_length = 0
+        self.loaded = False
+        self.last_scan = None
+        self.lock = threading.RLock()
+
+    def _add_locked(self, memory_id, text):
+        if memory_id in self.doc_terms:
+            self._remove_locked(memory_id)
+        term_freqs = Counter(tokenize(text))
+        self.doc_terms[memory_id] = term_freqs
+        self.doc_lengths[memory_id] = sum(term_freqs.values())
+        self.total_length += self.doc_lengths[memory_id]
+        for term, freq in term_freqs.items():
+            self.postings.setdefault(term, {})[memory_id] = freq
+
+    def _remove_locked(self, memory_id):
+        term_freqs = self.doc_terms.pop(memory_id, None)
+        if term_freqs is None:
+            return
+        self.total_length -= self.doc_lengths.pop(memory_id)
+        for term in term_freqs:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(memory_id, None)
+                if not posting:
+                    del self.postings[term]
+
+    def rebuild(self, collection):
+        """Rebuild the index from scratch with a paginated document scan"""
+        with self.lock:
+            self.postings = {}
+            self.doc_terms = {}
+            self.doc_lengths = {}
+            self.total_length = 0
+
+            def index_page(page):
+                for memory_id, document in zip(page.get('ids') or [], page.get('documents') or []):
+                    self._add_locked(memory_id, document)
+
+            scan = scan_collection(collection, index_page, include=['documents'])
+            self.loaded = True
+            self.last_scan = scan
+
+        logger.info("%s rebuilt: %s terms, %s documents in %sms (%s rows/sec)", self.label, len(self.postings), scan['rows'], scan['elapsed_ms'], scan['rows_per_sec'], extra={"fields": {"scan": scan}})
+
+    def ensure_fresh(self, collection, total_memories=None):
+        """Build the index on first use, rebuilding it if it is out of sync with the collection"""
+        if total_memories is None:
+            total_memories = collection.count()
+        with self.lock:
+            if not self.loaded or len(self.doc_terms) != total_memories:
+                logger.info("%s stale (indexed %s, collection has %s), rebuilding", self.label, len(self.doc_terms), total_memories)
+                self.rebuild(collection)
+
+    def add_document(self, memory_id, text):
+        """Index a newly stored memory; ignored until the index has been built"""
+        with self.lock:
+            if self.loaded:
+                self._add_locked(memory_id, text)
+
+    def remove_documents(self, memory_ids):
+        """Drop deleted memories from the index"""
+        with self.lock:
+            if self.loaded:
+                for memory_id in memory_ids:
+                    self._remove_locked(memory_id)
+
+    def search(self, query_text, k):
+        """Top-k (memory_id, bm25_score) pairs for the query, best first"""
+        with self.lock:
+            doc_count = len(self.doc_terms)
+            if not doc_count:
+                return []
+            avg_length = max(self.total_length / doc_count, 1.0)
+            scores = {}
+            for term in set(tokenize(query_text)):
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+                for memory_id, freq in posting.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[memory_id] / avg_length)
+                    scores[memory_id] = scores.get(memory_id, 0.0) + idf * freq * (self.k1 + 1) / (freq + norm)
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+
+    def describe(self):
+        with self.lock:
+            return {
+                "loaded": self.loaded,
+                "documents": len(self.doc_terms),
+                "terms": len(self.postings),
+                "last_scan": self.last_scan
+            }
+
+lexical_index = LexicalIndex()
+
+# PERFORMANCE OPTIMIZATION: In-memory inverted tag index for search_by_tag and delete_by_tag
+# (Chroma 0.4.x cannot match an item of the JSON tags string in a where clause)
+class TagPostingsIndex:
+    """Inverted index from tag to a sorted array of integer-coded memory IDs.
+
+    Memory IDs are mapped to dense uint32 codes in insertion order, so
+    appending a new memory keeps every postings array sorted and tag
+    queries become NumPy set operations over compact arrays. Built lazily
+    from a paginated metadata scan, kept current by the store/delete hooks,
+    and rebuilt when its size no longer matches collection.count().
+    """
+    label = "Tag postings index"
+
+    def __init__(self):
+        self.postings = {}  # tag -> array('I') of memory codes, ascending
+        self.codes = {}  # memory_id -> code
+        self.memory_ids = []  # code -> memory_id (None once deleted)
+        self.loaded = False
+        self.last_scan = None
+        self.lock = threading.RLock()
+
+    def _add_locked(self, memory_id, metadata):
+        if memory_id in self.codes:
+            return
+        code = len(self.memory_ids)
+        self.codes[memory_id] = code
+        self.memory_ids.append(memory_id)
+        for tag in set(get_memory_tags(metadata)):
+            self.postings.setdefault(tag, array("I")).append(code)
+
+    def rebuild(self, collection):
+        """Rebuild the index from scratch with a paginated metadata scan"""
+        with self.lock:
+            self.postings = {}
+            self.codes = {}
+            self.memory_ids = []
+
+            def index_page(page):
+                for memory_id, metadata in zip(page.get('ids') or [], page.get('metadatas') or []):
+                    self._add_locked(memory_id, metadata)
+
+            scan = scan_collection(collection, index_page, include=['metadatas'])
+            self.loaded = True
+            self.last_scan = scan
+
+        logger.info("%s rebuilt: %s tags, %s memories in %sms (%s rows/sec)", self.label, len(self.postings), scan['rows'], scan['elapsed_ms'], scan['rows_per_sec'], extra={"fields": {"scan": scan}})
+
+    def ensure_fresh(self, collection, total_memories=None):
+        """Build the index on first use, rebuilding it if it is out of sync with the collection"""
+        if total_memories is None:
+            total_memories = collection.count()
+        with self.lock:
+            if not self.loaded or len(self.codes) != total_memories:
+                logger.info("%s stale (indexed %s, collection has %s), rebuilding", self.label, len(self.codes), total_memories)
+                self.rebuild(collection)
+
+    def invalidate(self):
+        """Force a rebuild on next use, e.g. after finding IDs that no longer exist"""
+        with self.lock:
+            self.loaded = False
+
+    def add_memory(self, memory_id, metadata):
+        with self.lock:
+            if self.loaded:
+                self._add_locked(memory_id, metadata)
+
+    def remove_memories(self, memory_ids, metadatas):
+        with self.lock:
+            if not self.loaded:
+                return
+            for memory_id, metadata in zip(memory_ids, metadatas):
+                code = self.codes.pop(memory_id, None)
+                if code is None:
+                    continue
+                self.memory_ids[code] = None
+                for tag in set(get_memory_tags(metadata)):
+                    posting = self.postings.get(tag)
+                    if posting is None:
+                        continue
+                    position = bisect.bisect_left(posting, code)
+                    if position < len(posting) and posting[position] == code:
+                        del posting[position]
+                    if not posting:
+                        del self.postings[tag]
+
+    def lookup(self, tag):
+        """Codes of the memories carrying a tag, as a uint32 NumPy array (a copy, safe to use unlocked)"""
+        with self.lock:
+            return np.array(self.postings.get(tag, ()), dtype=np.uint32)
+
+    def document_frequency(self, tag):
+        with self.lock:
+            return len(self.postings.get(tag, ()))
+
+    def match_any(self, tags):
+        result = np.array([], dtype=np.uint32)
+        for tag in tags:
+            result = np.union1d(result, self.lookup(tag))
+        return result
+
+    def match_all(self, tags):
+        # Intersect rarest first so intermediate results stay small
+        result = None
+        for tag in sorted(set(tags), key=self.document_frequency):
+            codes = self.lookup(tag)
+            result = codes if result is None else np.intersect1d(result, codes, assume_unique=True)
+            if not len(result):
+                break
+        return result if result is not None else np.array([], dtype=np.uint32)
+
+    def all_codes(self):
+        """Codes of every indexed memory, ascending"""
+        with self.lock:
+            return np.array(sorted(self.codes.values()), dtype=np.uint32)
+
+    def resolve(self, codes):
+        """Memory IDs for an array of codes"""
+        with self.lock:
+            return [self.memory_ids[code] for code in codes.tolist() if self.memory_ids[code] is not None]
+
+    def describe(self):
+        with self.lock:
+            return {
+                "loaded": self.loaded,
+                "memories": len(self.codes),
+                "tags": len(self.postings),
+                "postings_bytes": sum(posting.itemsize * len(posting) for posting in self.postings.values()),
+                "last_scan": self.last_scan
+            }
+
+tag_postings = TagPostingsIndex()
+
+# PERFORMANCE OPTIMIZATION: Shared server cache
+class ServerCache:
+    """Size-bounded LRU cache with per-entry TTLs, shared by the whole server.
+
+    Entries live in namespaces (e.g. "stats", "health") so writes can drop a
+    whole namespace at once. Ages use time.monotonic() so wall-clock changes
+    never affect expiry. Namespaces listed in stale_namespaces keep expired
+    entries so get_stale() can serve them while a recompute runs.
+    """
+
+    def __init__(self, max_entries=1024, default_ttl_seconds=30, stale_namespaces=()):
+        self.max_entries = max_entries
+        self.default_ttl_seconds = default_ttl_seconds
+        self.stale_namespaces = set(stale_namespaces)
+        self.entries = OrderedDict()  # (namespace, key) -> (value, stored_at, ttl_seconds)
+        self.counters = {}  # namespace -> Counter of hits, misses, stale, sets, deltas, evictions, ...
+        self.lock = threading.Lock()
+
+    def _count(self, namespace, event, amount=1):
+        self.counters.setdefault(namespace, Counter())[event] += amount
+
+    def get(self, namespace, key):
+        with self.lock:
+            entry = self.entries.get((namespace, key))
+            if entry is not None:
+                value, stored_at, ttl_seconds = entry
+                age = time.monotonic() - stored_at
+                if age < ttl_seconds:
+                    self.entries.move_to_end((namespace, key))
+                    self._count(namespace, "hits")
+                    logger.debug("Cache HIT for %s:%s (age: %ds)", namespace, key, age, extra=SAMPLED)
+                    return value
+                elif namespace in self.stale_namespaces:
+                    self._count(namespace, "stale")
+                    logger.debug("Cache STALE for %s:%s", namespace, key, extra=SAMPLED)
+                    return None
+                else:
+                    del self.entries[(namespace, key)]
+                    self._count(namespace, "expirations")
+                    logger.debug("Cache EXPIRED for %s:%s", namespace, key, extra=SAMPLED)
+            self._count(namespace, "misses")
+            logger.debug("Cache MISS for %s:%s", namespace, key, extra=SAMPLED)
             return None
     
-    def set(self, key, value):
+    def get_stale(self, namespace, key):
+        """Return the last known value for key, even if its TTL has expired"""
         with self.lock:
-            self.cache[key] = value
-            self.last_updated[key] = datetime.now()
-            print(f"📊 Cache SET for {key}")
+            entry = self.entries.get((namespace, key))
+            if entry is None:
+                return None
+            self._count(namespace, "stale_hits")
+            return entry[0]
     
-    def invalidate(self, key=None):
+    def set(self, namespace, key, value, ttl_seconds=None):
         with self.lock:
-            if key:
-                if key in self.cache:
-                    del self.cache[key]
-                    del self.last_updated[key]
-                    print(f"📊 Cache INVALIDATED for {key}")
+            self.entries[(namespace, key)] = (
+                value,
+                time.monotonic(),
+                ttl_seconds if ttl_seconds is not None else self.default_ttl_seconds
+            )
+            self.entries.move_to_end((namespace, key))
+            self._count(namespace, "sets")
+            while len(self.entries) > self.max_entries:
+                (evicted_namespace, evicted_key), _ = self.entries.popitem(last=False)
+                self._count(evicted_namespace, "evictions")
+                logger.debug("Cache EVICTED %s:%s", evicted_namespace, evicted_key, extra=SAMPLED)
+            logger.debug("Cache SET for %s:%s", namespace, key, extra=SAMPLED)
+    
+    def apply_delta(self, namespace, key, update_fn):
+        """Update a cached entry in place instead of invalidating it.
+
+        update_fn receives the cached value and returns the updated value, or
+        None if drift was detected, in which case the entry is dropped. The
+        entry keeps its original timestamp so TTL expiry still forces a
+        periodic full recompute.
+        """
+        with self.lock:
+            entry = self.entries.get((namespace, key))
+            if entry is None:
+                return False
+            value, stored_at, ttl_seconds = entry
+            updated = update_fn(value)
+            if updated is None:
+                del self.entries[(namespace, key)]
+                self._count(namespace, "drift")
+                logger.debug("Cache DRIFT detected for %s:%s, entry dropped", namespace, key, extra=SAMPLED)
+                return False
+            self.entries[(namespace, key)] = (updated, stored_at, ttl_seconds)
+            self._count(namespace, "deltas")
+            logger.debug("Cache DELTA applied for %s:%s", namespace, key, extra=SAMPLED)
+            return True
+    
+    def expire(self, namespace, key):
+        """Age an entry past its TTL so the next read serves it stale and recomputes"""
+        with self.lock:
+            entry = self.entries.get((namespace, key))
+            if entry is not None:
+                value, _, ttl_seconds = entry
+                self.entries[(namespace, key)] = (value, time.monotonic() - ttl_seconds, ttl_seconds)
+                self._count(namespace, "expirations")
+
+    def invalidate(self, namespace=None, key=None):
+        """Drop one entry, a whole namespace, or (with no arguments) everything"""
+        with self.lock:
+            if namespace is None:
+                self.entries.clear()
+                logger.debug("Cache CLEARED (all keys)", extra=SAMPLED)
+            elif key is not None:
+                if self.entries.pop((namespace, key), None) is not None:
+                    self._count(namespace, "invalidations")
+                    logger.debug("Cache INVALIDATED for %s:%s", namespace, key, extra=SAMPLED)
             else:
-                self.cache.clear()
-                self.last_updated.clear()
-                print(f"📊 Cache CLEARED (all keys)")
+                keys = [entry_key for entry_key in self.entries if entry_key[0] == namespace]
+                for entry_key in keys:
+                    del self.entries[entry_key]
+                if keys:
+                    self._count(namespace, "invalidations", len(keys))
+                    logger.debug("Cache INVALIDATED namespace %s (%s keys)", namespace, len(keys), extra=SAMPLED)
+
+    def metrics(self):
+        """Hit/miss/eviction counters per namespace plus current size"""
+        with self.lock:
+            namespaces = {}
+            for namespace, counter in self.counters.items():
+                lookups = counter["hits"] + counter["misses"] + counter["stale"]
+                namespaces[namespace] = dict(counter)
+                namespaces[namespace]["entries"] = sum(1 for entry_key in self.entries if entry_key[0] == namespace)
+                namespaces[namespace]["hit_rate"] = round(counter["hits"] / lookups, 4) if lookups else None
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "default_ttl_seconds": self.default_ttl_seconds,
+                "namespaces": namespaces
+            }
+
+# Shared cache: 30-second default TTL, serving stale stats while they are recomputed
+CACHE_MAX_ENTRIES = int(os.environ.get("MCP_MEMORY_CACHE_MAX_ENTRIES", "1024"))
+server_cache = ServerCache(max_entries=CACHE_MAX_ENTRIES, default_ttl_seconds=30, stale_namespaces=("stats",))
+
+# PERFORMANCE OPTIMIZATION: Bounded executor for blocking ChromaDB and filesystem work
+class BlockingExecutor:
+    """Runs blocking calls on a dedicated thread pool with per-operation-class limits.
+
+    Each operation class ("read", "write", "scan", "backup", "health") has
+    its own asyncio semaphore, so e.g. writes are serialized and only one
+    backup runs at a time, while reads keep flowing. Health checks get their
+    own slots because reads can hold theirs for a whole index rebuild. The
+    pool is sized to the sum of the limits so one class can never starve
+    another of threads.
+
+    The "exclusive" class (collection migration) is a readers/writer lock
+    over every class not listed in ungated: it waits until their in-flight
+    calls have finished and holds new ones back until it is done, so
+    nothing runs against a collection that is being swapped out.
+    """
+    EXCLUSIVE = "exclusive"
+
+    def __init__(self, limits, ungated=()):
+        self.limits = dict(limits)
+        self.pool = ThreadPoolExecutor(max_workers=sum(self.limits.values()), thread_name_prefix="memory-dashboard")
+        self.semaphores = {}
+        self.ungated = set(ungated)
+        self.gated_active = 0  # admitted calls of gated classes, queued for their slot or running
+        self.exclusive_pending = 0  # exclusive calls waiting or running
+        self.gate_open = asyncio.Event()
+        self.gate_open.set()
+        self.gated_idle = asyncio.Event()
+        self.gated_idle.set()
+        self.waiting = Counter()
+        self.active = Counter()
+        self.completed = Counter()
+        self.max_waiting = Counter()
+        self.wait_ms_total = Counter()
+
+    async def run(self, operation_class, fn, *args, **kwargs):
+        if operation_class not in self.limits:
+            raise ValueError(f"Unknown operation class '{operation_class}'")
+        semaphore = self.semaphores.get(operation_class)
+        if semaphore is None:
+            semaphore = self.semaphores[operation_class] = asyncio.Semaphore(self.limits[operation_class])
+
+        queued_at = time.monotonic()
+        self.waiting[operation_class] += 1
+        self.max_waiting[operation_class] = max(self.max_waiting[operation_class], self.waiting[operation_class])
+        try:
+            await self._admit(operation_class)
+            try:
+                await semaphore.acquire()
+            except BaseException:
+                self._release(operation_class)
+                raise
+        finally:
+            self.waiting[operation_class] -= 1
+        try:
+            self.wait_ms_total[operation_class] += (time.monotonic() - queued_at) * 1000
+            self.active[operation_class] += 1
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.pool, functools.partial(fn, *args, **kwargs))
+        finally:
+            self.active[operation_class] -= 1
+            self.completed[operation_class] += 1
+            semaphore.release()
+            self._release(operation_class)
+
+    async def _admit(self, operation_class):
+        """Wait until the readers/writer gate lets this call take its class slot"""
+        if operation_class in self.ungated:
+            return
+        if operation_class != self.EXCLUSIVE:
+            # Pending exclusive calls go first, so a steady stream of reads cannot starve them
+            while self.exclusive_pending:
+                await self.gate_open.wait()
+            self.gated_active += 1
+            self.gated_idle.clear()
+            return
+        self.exclusive_pending += 1
+        self.gate_open.clear()
+        try:
+            while self.gated_active:
+                await self.gated_idle.wait()
+        except BaseException:
+            self._release(operation_class)
+            raise
+
+    def _release(self, operation_class):
+        if operation_class in self.ungated:
+            return
+        if operation_class == self.EXCLUSIVE:
+            self.exclusive_pending -= 1
+            if not self.exclusive_pending:
+                self.gate_open.set()
+        else:
+            self.gated_active -= 1
+            if not self.gated_active:
+                self.gated_idle.set()
+
+    def metrics(self):
+        """Queue depth, in-flight and completed counts per operation class"""
+        return {
+            operation_class: {
+                "limit": limit,
+                "waiting": self.waiting[operation_class],
+                "active": self.active[operation_class],
+                "completed": self.completed[operation_class],
+                "max_waiting": self.max_waiting[operation_class],
+                "avg_wait_ms": round(self.wait_ms_total[operation_class] / self.completed[operation_class], 2) if self.completed[operation_class] else 0
+            }
+            for operation_class, limit in self.limits.items()
+        }
+
+EXECUTOR_LIMITS = {
+    "read": int(os.environ.get("MCP_MEMORY_EXECUTOR_READERS", "8")),
+    "write": 1,
+    "scan": int(os.environ.get("MCP_MEMORY_EXECUTOR_SCANS", "2")),
+    "backup": 1,
+    "health": 2,
+    "exclusive": 1
+}
+# Health checks only touch the client heartbeat, so they keep running during a migration
+blocking_executor = BlockingExecutor(EXECUTOR_LIMITS, ungated=("health",))
+
+# Operation class per tool; anything not listed is a read
+TOOL_OPERATION_CLASSES = {
+    "store_memory": "write",
+    "delete_memory": "write",
+    "delete_by_tag": "write",
+    "dashboard_migrate_collection": "exclusive",
+    "dashboard_benchmark_hnsw": "scan",
+    "dashboard_get_detailed_stats": "scan",
+    "dashboard_get_tag_counts": "scan",
+    "dashboard_get_timeline": "scan",
+    "create_backup": "backup",
+    "dashboard_create_backup": "backup",
+    "check_database_health": "health",
+    "dashboard_check_health": "health",
+    "check_embedding_model": "health"
+}
+
+# Event loop the server runs on, so worker threads can schedule background work on it
+main_event_loop = None
+
+# Heartbeats are cached briefly so frequent health polling doesn't hit ChromaDB every time
+HEALTH_CACHE_TTL = 2
+
+# Semantic search results are cached per collection version, so the TTL only bounds memory use
+SEARCH_CACHE_TTL = float(os.environ.get("MCP_MEMORY_SEARCH_CACHE_TTL", "300"))
+
+# The collection count (the external change signal for cached searches) is cached briefly too
+COLLECTION_COUNT_TTL = float(os.environ.get("MCP_MEMORY_COLLECTION_COUNT_TTL", "2"))
+
+# Collection version counter: bumped on every write so cached results can never be stale
+collection_version = 0
+collection_version_lock = threading.Lock()
+
+def bump_collection_version():
+    global collection_version
+    with collection_version_lock:
+        collection_version += 1
+        version = collection_version
+    # Our own write changed the count, so don't pin new cache entries to the old one
+    server_cache.invalidate("collection", "count")
+    return version
+
+def get_collection_version():
+    with collection_version_lock:
+        return collection_version
+
+def get_search_cache_version():
+    """Version that cached search results are pinned to.
+
+    collection_version only sees writes made by this process; Electron direct
+    mode and mcp-memory-service write to the same Chroma directory, so the
+    collection count is included as an external change signal. The count is
+    cached for COLLECTION_COUNT_TTL seconds, so a cache hit costs no SQLite
+    query and external writes show up within that window.
+    """
+    return (get_collection_version(), get_collection_count())
+
+def get_collection_count():
+    """collection.count(), cached for COLLECTION_COUNT_TTL seconds"""
+    count = server_cache.get("collection", "count")
+    if count is None:
+        count = collection.count()
+        server_cache.set("collection", "count", count, ttl_seconds=COLLECTION_COUNT_TTL)
+    return count
+
+# Query embedding memoization: in-process LRU plus an optional on-disk store
+EMBEDDING_CACHE_SIZE = int(os.environ.get("MCP_MEMORY_EMBEDDING_CACHE_SIZE", "1024"))
+EMBEDDING_STORE_PATH = os.environ.get("MCP_MEMORY_EMBEDDING_STORE_PATH")
+EMBEDDING_STORE_MAX_ROWS = int(os.environ.get("MCP_MEMORY_EMBEDDING_STORE_MAX_ROWS", "100000"))
+
+class EmbeddingStore:
+    """Append-only on-disk store of query embeddings shared across server processes.
+
+    records.bin holds fixed-size records of (SHA-1 of the query text, float32
+    vector), so a hash can never be paired with another row's vector.
+    Appends hold an exclusive flock on the store's lock file and take the
+    row number from the file size at write time; a torn record left by a
+    crash is overwritten by the next append. Readers index records written
+    by other processes on a miss. meta.json records the format, embedding
+    model and dimension; a mismatch resets the store. Without fcntl (Windows)
+    only threads in this process are serialized.
+    """
+
+    FORMAT = 2
+
+    def __init__(self, path, model_name, max_rows):
+        self.path = path
+        self.model_name = model_name
+        self.max_rows = max_rows
+        self.records_path = os.path.join(path, "records.bin")
+        self.meta_path = os.path.join(path, "meta.json")
+        self.dimension = None
+        self.record_dtype = None
+        self.rows = {}  # hex digest -> row number
+        self.indexed_rows = 0
+        self.mapped = None
+        self.lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self.lock_file = open(os.path.join(path, "lock"), "a+b")
+        self._load()
+
+    @contextmanager
+    def _file_lock(self, exclusive):
+        """Hold an flock on the lock file (no-op without fcntl)"""
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self.lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+    def _load(self):
+        with self.lock, self._file_lock(exclusive=True):
+            try:
+                with open(self.meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+                if meta.get("format") != self.FORMAT or meta.get("model") != self.model_name:
+                    logger.warning("Embedding store at %s was built with format %s / %s, resetting for %s",
+                                   self.path, meta.get("format"), meta.get("model"), self.model_name)
+                    self._reset_locked()
+                    return
+                self._set_dimension(int(meta["dimension"]))
+                self._index_new_locked()
+            except FileNotFoundError:
+                self._reset_locked()
+                return
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.error("Failed to load embedding store from %s: %s", self.path, e)
+                self._reset_locked()
+                return
+        logger.info("Embedding store loaded: %s vectors from %s", len(self.rows), self.path)
+
+    def _reset_locked(self):
+        # vectors.f32/hashes.txt are the pre-record layout, whose rows could drift apart
+        for name in ("records.bin", "meta.json", "vectors.f32", "hashes.txt"):
+            file_path = os.path.join(self.path, name)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        self.dimension = None
+        self.record_dtype = None
+        self.rows = {}
+        self.indexed_rows = 0
+        self.mapped = None
+
+    def _set_dimension(self, dimension):
+        self.dimension = dimension
+        self.record_dtype = np.dtype([("hash", "S40"), ("vector", "<f4", (dimension,))])
+
+    def _index_new_locked(self):
+        """Index complete records appended since the last call (by any process)"""
+        if self.record_dtype is None:
+            # Another process may have created the store since we loaded it
+            try:
+                with open(self.meta_path, "r", encoding="utf-8") as f:
+                    meta = json.load(f)
+            except FileNotFoundError:
+                return
+            if meta.get("format") != self.FORMAT or meta.get("model") != self.model_name:
+                return
+            self._set_dimension(int(meta["dimension"]))
+        try:
+            complete_rows = os.path.getsize(self.records_path) // self.record_dtype.itemsize
+        except FileNotFoundError:
+            complete_rows = 0
+        if complete_rows < self.indexed_rows:
+            # Another process reset the store
+            self.rows = {}
+            self.indexed_rows = 0
+            self.mapped = None
+        if complete_rows == 0 or (self.mapped is not None and complete_rows == self.indexed_rows):
+            return
+        self.mapped = np.memmap(self.records_path, dtype=self.record_dtype, mode="r", shape=(complete_rows,))
+        for row, digest in enumerate(self.mapped["hash"][self.indexed_rows:complete_rows].tolist(), start=self.indexed_rows):
+            self.rows.setdefault(digest, row)
+        self.indexed_rows = complete_rows
+
+    @staticmethod
+    def hash_text(text):
+        # Hex, not raw bytes: NumPy "S" fields strip trailing NUL bytes
+        return hashlib.sha1(text.encode("utf-8")).hexdigest().encode("ascii")
+
+    def get(self, text):
+        digest = self.hash_text(text)
+        with self.lock:
+            row = self.rows.get(digest)
+            if row is None:
+                try:
+                    with self._file_lock(exclusive=False):
+                        self._index_new_locked()
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    logger.error("Failed to read embedding store at %s: %s", self.path, e)
+                    return None
+                row = self.rows.get(digest)
+            if row is None or self.mapped is None or row >= self.mapped.shape[0]:
+                return None
+            record = self.mapped[row]
+            if record["hash"] != digest:
+                return None
+            return np.array(record["vector"])
+
+    def put(self, text, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        digest = self.hash_text(text)
+        with self.lock:
+            if digest in self.rows:
+                return
+            try:
+                with self._file_lock(exclusive=True):
+                    self._index_new_locked()
+                    if self.dimension is None:
+                        self._set_dimension(int(vector.shape[0]))
+                        temp_path = self.meta_path + ".tmp"
+                        with open(temp_path, "w", encoding="utf-8") as f:
+                            json.dump({"format": self.FORMAT, "model": self.model_name, "dimension": self.dimension}, f)
+                        os.replace(temp_path, self.meta_path)
+                    if vector.shape[0] != self.dimension:
+                        return
+                    if digest in self.rows or self.indexed_rows >= self.max_rows:
+                        return
+                    record = np.zeros((), dtype=self.record_dtype)
+                    record["hash"] = digest
+                    record["vector"] = vector
+                    # Not opened in append mode, so a torn tail record is overwritten
+                    with open(os.open(self.records_path, os.O_RDWR | os.O_CREAT, 0o644), "r+b") as f:
+                        row = f.seek(0, os.SEEK_END) // self.record_dtype.itemsize
+                        f.seek(row * self.record_dtype.itemsize)
+                        f.write(record.tobytes())
+                    self._index_new_locked()
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                logger.error("Failed to persist query embedding to %s: %s", self.path, e)
+
+class EmbeddingCache:
+    """LRU cache of query text -> embedding vector in front of the embedding model.
+
+    Misses are looked up in the optional EmbeddingStore, and anything still
+    missing is embedded in a single batched model call.
+    """
+
+    def __init__(self, embedding_function, max_entries=1024, store=None):
+        self.embedding_function = embedding_function
+        self.max_entries = max_entries
+        self.store = store
+        self.entries = OrderedDict()
+        self.counters = Counter()
+        self.lock = threading.Lock()
+
+    def get_many(self, texts):
+        """Return one float32 vector per text, embedding all uncached texts in one call"""
+        vectors = [None] * len(texts)
+        missing = {}
+        with self.lock:
+            for i, text in enumerate(texts):
+                vector = self.entries.get(text)
+                if vector is not None:
+                    self.entries.move_to_end(text)
+                    self.counters["hits"] += 1
+                    vectors[i] = vector
+                else:
+                    missing.setdefault(text, []).append(i)
+
+        if self.store is not None:
+            for text in list(missing):
+                vector = self.store.get(text)
+                if vector is not None:
+                    for i in missing.pop(text):
+                        vectors[i] = vector
+                    self._remember(text, vector, "disk_hits")
+
+        if missing:
+            missing_texts = list(missing)
+            start_time = time.time()
+            embedded = self.embedding_function(missing_texts)
+            logger.debug("Embedded %s queries in %.1fms", len(missing_texts), (time.time() - start_time) * 1000)
+            for text, raw_vector in zip(missing_texts, embedded):
+                vector = np.asarray(raw_vector, dtype=np.float32)
+                for i in missing[text]:
+                    vectors[i] = vector
+                self._remember(text, vector, "misses")
+                if self.store is not None:
+                    self.store.put(text, vector)
+
+        return vectors
+
+    def get(self, text):
+        return self.get_many([text])[0]
+
+    def _remember(self, text, vector, counter=None):
+        """Add a vector to the LRU, counting it under counter (e.g. "misses") while the lock is held"""
+        with self.lock:
+            if counter:
+                self.counters[counter] += 1
+            self.entries[text] = vector
+            self.entries.move_to_end(text)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def metrics(self):
+        with self.lock:
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "persistent_store": self.store.path if self.store is not None else None,
+                **self.counters
+            }
+
+# Without a local embedding function (e.g. thin client) queries fall back to query_texts
+embedding_cache = None
+if embedding_function is not None:
+    embedding_store = None
+    if EMBEDDING_STORE_PATH:
+        try:
+            embedding_store = EmbeddingStore(EMBEDDING_STORE_PATH, type(embedding_function).__name__, EMBEDDING_STORE_MAX_ROWS)
+        except OSError as e:
+            logger.error("Could not open embedding store at %s: %s", EMBEDDING_STORE_PATH, e)
+    embedding_cache = EmbeddingCache(embedding_function, max_entries=EMBEDDING_CACHE_SIZE, store=embedding_store)
+
+# Optional read-only SQL fast path against Chroma's own SQLite file for exact stats
+STATS_SQL_FASTPATH = os.environ.get("MCP_MEMORY_STATS_SQL_FASTPATH", "false").lower() in ("1", "true", "yes")
+CHROMA_SQLITE_PATH = os.path.join(CHROMA_PATH, "chroma.sqlite3")
+# Migration versions of the Chroma SQLite layout the queries below were written against (chromadb 0.4.x)
+SUPPORTED_CHROMA_SCHEMA = {"sysdb": 4, "metadb": 3}
+
+# Background stats refresh interval in seconds (0 disables the periodic refresher)
+STATS_REFRESH_INTERVAL = float(os.environ.get("MCP_MEMORY_STATS_REFRESH_INTERVAL", "25"))
+
+def track_query_time(func):
+    """Decorator to track query execution times"""
+    def wrapper(*args, **kwargs):
+        start_time = time.time()
+        result = func(*args, **kwargs)
+        end_time = time.time()
+        query_time_ms = (end_time - start_time) * 1000
+        query_times.append(query_time_ms)
+        return result
+    return wrapper
+
+def update_cached_stats(memories_delta, new_tags=0, dropped_tags=0):
+    """Apply a write to the cached stats in place instead of forcing a recompute.
+
+    new_tags/dropped_tags come from the tag index; None means the index could
+    not track the write, so the cached stats are invalidated instead.
+    """
+    # Detailed analytics cannot be patched cheaply, so any write invalidates them
+    server_cache.invalidate("stats", "detailed")
+
+    tags_known = new_tags is not None and dropped_tags is not None
+    needs_refresh = False
+
+    def apply(stats):
+        nonlocal needs_refresh
+        if "error" in stats:
+            return None
+        updated = dict(stats)
+        updated["total_memories"] = stats["total_memories"] + memories_delta
+        # The scan that produced the entry no longer describes the collection
+        updated.pop("last_scan", None)
+        if stats.get("unique_tags_method") == "sqlite":
+            # SQL-sourced stats never loaded the tag index, so there is nothing
+            # to drift-check against; an unknown tag delta marks the entry
+            # stale and the cheap SQL recompute runs in the background.
+            if tags_known:
+                updated["unique_tags"] = stats["unique_tags"] + new_tags - dropped_tags
+            else:
+                needs_refresh = True
+            return updated
+        if not tags_known:
+            return None
+        updated["unique_tags"] = stats["unique_tags"] + new_tags - dropped_tags
+        # Drift check: the cached numbers must agree with the tag index
+        if tag_index.snapshot() != (updated["total_memories"], updated["unique_tags"]):
+            return None
+        updated.update(tag_index.describe())
+        return updated
+
+    server_cache.apply_delta("stats", "summary", apply)
+    if needs_refresh:
+        server_cache.expire("stats", "summary")
+
+def record_memory_stored(memory_id, content, metadata):
+    """Keep indexes and cached stats current after store_memory"""
+    bump_collection_version()
+    new_tags = tag_index.add_memory(metadata)
+    timeline_index.add_memory(metadata)
+    lexical_index.add_document(memory_id, content)
+    tag_postings.add_memory(memory_id, metadata)
+    update_cached_stats(1, new_tags=new_tags)
+
+def record_memories_deleted(memory_ids, metadatas):
+    """Keep indexes and cached stats current after memories are deleted"""
+    metadatas = [meta or {} for meta in metadatas]
+    bump_collection_version()
+    dropped_tags = tag_index.remove_memories(metadatas)
+    timeline_index.remove_memories(metadatas)
+    lexical_index.remove_documents(memory_ids)
+    tag_postings.remove_memories(memory_ids, metadatas)
+    update_cached_stats(-len(metadatas), dropped_tags=dropped_tags)
+
+def get_heartbeat():
+    """ChromaDB heartbeat, cached for HEALTH_CACHE_TTL seconds"""
+    heartbeat_ns = server_cache.get("health", "heartbeat")
+    if heartbeat_ns is None:
+        heartbeat_ns = client.heartbeat()
+        server_cache.set("health", "heartbeat", heartbeat_ns, ttl_seconds=HEALTH_CACHE_TTL)
+    return heartbeat_ns
+
+def get_average_query_time():
+    """Calculate average query time from recent queries"""
+    if not query_times:
+        return 0
+    return round(sum(query_times) / len(query_times), 2)
+
+def get_stats_from_sqlite():
+    """Exact stats via aggregate SQL on chroma.sqlite3, opened read-only.
+
+    Tags are counted from the JSON arrays Chroma stores in embedding_metadata.
+    Returns None when the fast path is disabled, the file is missing or the
+    schema version is not one we know, so callers fall back to the API path.
+    """
+    if not STATS_SQL_FASTPATH or not os.path.exists(CHROMA_SQLITE_PATH):
+        return None
+
+    start_time = time.time()
+    try:
+        uri = Path(os.path.abspath(CHROMA_SQLITE_PATH)).as_uri() + "?mode=ro"
+        connection = sqlite3.connect(uri, uri=True, timeout=1.0)
+    except sqlite3.Error as e:
+        logger.error("Could not open %s read-only: %s", CHROMA_SQLITE_PATH, e)
+        return None
+
+    try:
+        schema_versions = dict(connection.execute(
+            "SELECT dir, MAX(version) FROM migrations GROUP BY dir"
+        ).fetchall())
+        for migration_dir, version in SUPPORTED_CHROMA_SCHEMA.items():
+            if schema_versions.get(migration_dir) != version:
+                logger.warning("Unsupported Chroma schema %s, falling back to API stats", schema_versions)
+                return None
+
+        collection_id = str(collection.id)
+        total_memories = connection.execute(
+            """
+            SELECT COUNT(*)
+            FROM embeddings e
+            JOIN segments s ON s.id = e.segment_id
+            WHERE s.collection = ? AND s.scope = 'METADATA'
+            """,
+            (collection_id,)
+        ).fetchone()[0]
+        unique_tags = connection.execute(
+            """
+            SELECT COUNT(DISTINCT tag.value)
+            FROM embedding_metadata em
+            JOIN embeddings e ON e.id = em.id
+            JOIN segments s ON s.id = e.segment_id,
+                 json_each(CASE WHEN json_valid(em.string_value) AND json_type(em.string_value) = 'array'
+                                THEN em.string_value ELSE '[]' END) tag
+            WHERE s.collection = ? AND s.scope = 'METADATA' AND em.key = 'tags'
+              AND tag.type = 'text'
+            """,
+            (collection_id,)
+        ).fetchone()[0]
+    except sqlite3.Error as e:
+        logger.error("SQL stats query failed, falling back to API stats: %s", e)
+        return None
+    finally:
+        connection.close()
+
+    query_time = (time.time() - start_time) * 1000
+    logger.info("Stats read from SQLite in %.1fms", query_time, extra={"fields": {"elapsed_ms": round(query_time, 1)}})
+    return {
+        "total_memories": total_memories,
+        "unique_tags": unique_tags,
+        "unique_tags_method": "sqlite"
+    }
+
+def compute_stats():
+    """Compute stats from the collection and tag index and store them in the cache"""
+    start_time = time.time()
+    
+    try:
+        # OPTIMIZATION: Aggregate SQL straight on Chroma's SQLite file when enabled
+        stats = get_stats_from_sqlite()
+        if stats is not None:
+            server_cache.set("stats", "summary", stats)
+            return stats
+        
+        # Get total count (this is fast)
+        total_memories = collection.count()
+        logger.debug("Total memories count: %s", total_memories)
+        
+        # OPTIMIZATION: Exact unique tag count from the persistent tag index
+        # (rebuilt with a full scan only when missing or out of sync)
+        if total_memories == 0:
+            stats = {"total_memories": 0, "unique_tags": 0}
+        else:
+            rebuilt = tag_index.ensure_fresh(collection, total_memories)
+            stats = {
+                "total_memories": total_memories,
+                "unique_tags": tag_index.unique_tags()
+            }
+            stats.update(tag_index.describe())
+            # Report scan throughput only when this computation rebuilt the index
+            if rebuilt:
+                stats["last_scan"] = tag_index.last_scan
+                # A count mismatch usually means another process wrote memories without timestamp_epoch
+                schedule_timestamp_backfill()
+        
+        # Cache the results
+        server_cache.set("stats", "summary", stats)
+        
+        end_time = time.time()
+        query_time = (end_time - start_time) * 1000
+        logger.info("Stats computed in %.1fms", query_time, extra={"fields": {"elapsed_ms": round(query_time, 1)}})
+        
+        return stats
+        
+    except Exception as e:
+        logger.error("Error computing stats: %s", e)
+        error_stats = {
+            "total_memories": 0,
+            "unique_tags": 0,
+            "error": str(e)
+        }
+        return error_stats
+
+# Background refresh task for stale stats (at most one in flight)
+stats_refresh_task = None
+
+async def refresh_stats_in_background():
+    """Recompute stats on the bounded executor so the event loop stays responsive"""
+    try:
+        await blocking_executor.run("scan", compute_stats)
+    except Exception as e:
+        logger.error("Error refreshing stats in background: %s", e)
+
+def schedule_stats_refresh():
+    """Schedule a background recompute of the stats. Returns False if the event loop is not running.
+
+    Safe to call from executor threads: the task is handed to the main loop.
+    """
+    global stats_refresh_task
+    if stats_refresh_task is not None and not stats_refresh_task.done():
+        return True
+    if main_event_loop is None or main_event_loop.is_closed() or not main_event_loop.is_running():
+        return False
+    stats_refresh_task = asyncio.run_coroutine_threadsafe(refresh_stats_in_background(), main_event_loop)
+    return True
+
+async def stats_refresher(interval_seconds):
+    """Periodically recompute stats so dashboard_get_stats always hits a warm cache"""
+    while True:
+        await refresh_stats_in_background()
+        await asyncio.sleep(interval_seconds)
+
+def get_stats_optimized():
+    """OPTIMIZED stats method with caching and improved performance"""
+    
+    # Check cache first
+    cached_stats = server_cache.get("stats", "summary")
+    if cached_stats:
+        return cached_stats
+    
+    # Stale-while-revalidate: serve the last known value and recompute in the background
+    stale_stats = server_cache.get_stale("stats", "summary")
+    if stale_stats and schedule_stats_refresh():
+        logger.info("Serving stale stats while refreshing in background")
+        return stale_stats
+    
+    return compute_stats()
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted sequence"""
+    if not sorted_values:
+        return 0
+    rank = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+def compute_detailed_stats():
+    """Compute tag, type, timeline and content size analytics in a single streaming pass"""
+    tag_frequency = Counter()
+    type_distribution = Counter()
+    memories_per_day = Counter()
+    content_lengths = array('L')
+
+    def analyze_page(page):
+        metadatas = page.get('metadatas') or []
+        documents = page.get('documents') or []
+        for i in range(len(page['ids'])):
+            meta = metadatas[i] if i < len(metadatas) and metadatas[i] is not None else {}
+            tag_frequency.update(set(get_memory_tags(meta)))
+            type_distribution[meta.get("type") or "untyped"] += 1
+            memories_per_day[get_memory_day(meta) or "unknown"] += 1
+            document = documents[i] if i < len(documents) else None
+            content_lengths.append(len(document) if document else 0)
+
+    scan = scan_collection(collection, analyze_page, include=['metadatas', 'documents'])
+
+    sorted_lengths = sorted(content_lengths)
+    return {
+        "total_memories": scan["rows"],
+        "unique_tags": len(tag_frequency),
+        "tag_frequency": [{"tag": tag, "count": count} for tag, count in tag_frequency.most_common()],
+        "type_distribution": dict(type_distribution.most_common()),
+        "memories_per_day": dict(sorted(memories_per_day.items())),
+        "content_length": {
+            "min": sorted_lengths[0] if sorted_lengths else 0,
+            "mean": round(sum(sorted_lengths) / len(sorted_lengths), 1) if sorted_lengths else 0,
+            "p50": percentile(sorted_lengths, 0.5),
+            "p90": percentile(sorted_lengths, 0.9),
+            "p99": percentile(sorted_lengths, 0.99),
+            "max": sorted_lengths[-1] if sorted_lengths else 0
+        },
+        "scan": scan
+    }
+
+def get_detailed_stats(top_k=20):
+    """Cached detailed stats; the full tag histogram is cached and trimmed to top_k per call"""
+    detailed_stats = server_cache.get("stats", "detailed")
+    if not detailed_stats:
+        detailed_stats = compute_detailed_stats()
+        server_cache.set("stats", "detailed", detailed_stats)
+
+    result = dict(detailed_stats)
+    result["top_tags"] = detailed_stats["tag_frequency"][:top_k]
+    del result["tag_frequency"]
+    return result
+
+def normalize_query(query_text):
+    """Collapse whitespace so trivially different spellings share a cache entry"""
+    return " ".join(query_text.split())
+
+# Field projection: which parts of each memory a search returns, and the Chroma include each one needs
+SEARCH_FIELDS = ("id", "content", "metadata", "tags", "similarity")
+FIELD_INCLUDES = {"content": "documents", "metadata": "metadatas", "tags": "metadatas", "similarity": "distances"}
+
+def parse_fields(arguments):
+    """Requested fields from the tool arguments ("fields", or its alias "include"), or None for all of them"""
+    fields = arguments.get("fields", arguments.get("include"))
+    if fields is None:
+        return None
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(",")]
+    if not isinstance(fields, list):
+        raise ValueError("fields must be a list of field names")
+    unknown = [field for field in fields if field not in SEARCH_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields {unknown}; expected a subset of {list(SEARCH_FIELDS)}")
+    # The id is always returned so results stay addressable
+    return tuple(field for field in SEARCH_FIELDS if field == "id" or field in fields)
+
+def chroma_include(fields, distances=True):
+    """Chroma include list covering the requested fields, so unrequested columns are never loaded"""
+    if fields is None:
+        fields = SEARCH_FIELDS
+    include = []
+    for field in fields:
+        column = FIELD_INCLUDES.get(field)
+        if column and column not in include and (distances or column != "distances"):
+            include.append(column)
+    return include
+
+def build_memory(memory_id, document, metadata, distance=None, fields=None):
+    """One memory as returned by tools, restricted to the requested fields"""
+    # Ensure metadata is a dict, default to empty if None
+    current_metadata = metadata if metadata is not None else {}
+    memory = {
+        "id": memory_id,
+        "content": document if document is not None else "",
+        "metadata": current_metadata,
+        # Ensure tags are present in metadata, defaulting to empty list
+        "tags": get_memory_tags(current_metadata)
+    }
+    if distance is not None or (fields is not None and "similarity" in fields):
+        memory["similarity"] = 1.0 - (distance if distance is not None else 1.0) # Handle potential None in distances
+    if fields is not None:
+        memory = {field: memory[field] for field in fields if field in memory}
+    return memory
+
+def format_query_results(results, query_index=0, limit=None, fields=None):
+    """Convert one query's slice of a collection.query result into the memories list returned by tools"""
+    # Results from query are structured with lists of lists, one inner list per query text
+    ids = (results.get('ids') or [])[query_index]
+    if limit is not None:
+        ids = ids[:limit]
+    # Columns that were not included come back as None
+    missing = [None] * len(ids)
+    documents = results['documents'][query_index] if results.get('documents') else missing
+    metadatas = results['metadatas'][query_index] if results.get('metadatas') else missing
+    distances = results['distances'][query_index] if results.get('distances') else missing
+    if fields is None:
+        distances = [1.0 if distance is None else distance for distance in distances]
+
+    return [
+        build_memory(ids[i], documents[i], metadatas[i], distances[i], fields)
+        for i in range(len(ids))
+    ]
+
+def search_cache_key(normalized_query, n_results, where, fields=None, tag_filter=None):
+    return json.dumps({"query": normalized_query, "n_results": n_results, "where": where, "fields": fields, "tags": tag_filter}, sort_keys=True)
+
+def run_semantic_search_batch(queries, where=None, fields=None, tag_filter=None):
+    """Semantic search for many (query_text, n_results) pairs with one embedding and one ANN call.
+
+    Each query is first looked up in the result cache (pinned to
+    get_search_cache_version()); all remaining queries are embedded in a single
+    batch and sent to one collection.query using the largest n_results,
+    then trimmed per query. Only the columns needed for the requested
+    fields are loaded; a tag_filter restricts the search to the matching
+    memories (see query_collection). Returns one memories list per query,
+    in order.
+    """
+    version = get_search_cache_version()
+    normalized_queries = [normalize_query(query_text) for query_text, _ in queries]
+    results_per_query = [None] * len(queries)
+    pending = []
+
+    for i, (normalized_query, (_, n_results)) in enumerate(zip(normalized_queries, queries)):
+        cache_key = search_cache_key(normalized_query, n_results, where, fields, tag_filter)
+        cached = server_cache.get("search", cache_key)
+        if cached is not None:
+            cached_version, cached_memories = cached
+            if cached_version == version:
+                results_per_query[i] = cached_memories
+                continue
+            server_cache.invalidate("search", cache_key)
+        pending.append(i)
+
+    if not pending:
+        return results_per_query
+
+    # Repeated query texts are searched once and shared
+    pending_texts = list(dict.fromkeys(normalized_queries[i] for i in pending))
+    text_positions = {text: position for position, text in enumerate(pending_texts)}
+    max_results = max(queries[i][1] for i in pending)
+
+    # Track query time
+    start_time = time.time()
+
+    if embedding_cache is not None:
+        query_args = {"query_embeddings": [vector.tolist() for vector in embedding_cache.get_many(pending_texts)]}
+    else:
+        query_args = {"query_texts": pending_texts}
+
+    results = query_collection(query_args, max_results, where, chroma_include(fields), resolve_tag_filter(tag_filter))
+
+    # Record query time
+    end_time = time.time()
+    query_time_ms = (end_time - start_time) * 1000
+    query_times.append(query_time_ms)
+
+    for i in pending:
+        n_results = queries[i][1]
+        memories_list = format_query_results(results, text_positions[normalized_queries[i]], limit=n_results, fields=fields)
+        results_per_query[i] = memories_list
+        server_cache.set("search", search_cache_key(normalized_queries[i], n_results, where, fields, tag_filter), (version, memories_list), ttl_seconds=SEARCH_CACHE_TTL)
+
+    return results_per_query
+
+def run_semantic_search(query_text, n_results, where=None, fields=None, tag_filter=None):
+    """Semantic search for a single query through the result cache"""
+    return run_semantic_search_batch([(query_text, n_results)], where, fields, tag_filter)[0]
+
+# Re-ranking: over-fetch with embeddings, rescore exactly, then dedup, MMR and a similarity cutoff
+RERANK_OVERFETCH = int(os.environ.get("MCP_MEMORY_RERANK_OVERFETCH", "4"))
+DEDUP_THRESHOLD = float(os.environ.get("MCP_MEMORY_DEDUP_THRESHOLD", "0.95"))
+DEDUP_MAX_CANDIDATES = int(os.environ.get("MCP_MEMORY_DEDUP_MAX_CANDIDATES", "500"))
+
+def get_rerank_options(arguments):
+    """(min_similarity, mmr_lambda, dedup_threshold) from the tool arguments, or None when re-ranking was not requested"""
+    min_similarity = arguments.get("min_similarity")
+    mmr_lambda = arguments.get("mmr_lambda")
+    dedup_threshold = arguments.get("dedup_threshold")
+    if dedup_threshold is None and arguments.get("dedup"):
+        dedup_threshold = DEDUP_THRESHOLD
+    if min_similarity is None and mmr_lambda is None and dedup_threshold is None and not arguments.get("rerank"):
+        return None
+    if mmr_lambda is not None and not 0.0 <= float(mmr_lambda) <= 1.0:
+        raise ValueError("mmr_lambda must be between 0 and 1")
+    if dedup_threshold is not None and not 0.0 < float(dedup_threshold) <= 1.0:
+        raise ValueError("dedup_threshold must be in (0, 1]")
+    return (
+        float(min_similarity) if min_similarity is not None else None,
+        float(mmr_lambda) if mmr_lambda is not None else None,
+        float(dedup_threshold) if dedup_threshold is not None else None
+    )
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+def mmr_select(similarities, pairwise, k, mmr_lambda):
+    """Greedy maximal marginal relevance over precomputed similarities; returns selected row indices"""
+    selected = []
+    max_redundancy = np.zeros(len(similarities), dtype=np.float32)
+    available = np.ones(len(similarities), dtype=bool)
+    for _ in range(min(k, len(similarities))):
+        scores = mmr_lambda * similarities - (1.0 - mmr_lambda) * max_redundancy if selected else similarities.copy()
+        scores[~available] = -np.inf
+        pick = int(np.argmax(scores))
+        selected.append(pick)
+        available[pick] = False
+        max_redundancy = np.maximum(max_redundancy, pairwise[pick])
+    return selected
+
+def cluster_duplicates(order, pairwise, threshold):
+    """Greedy near-duplicate clustering: walking candidates best first, each unclaimed one
+    becomes a representative and claims every unclaimed candidate at or above threshold.
+    Returns {representative: [duplicate, ...]} in representative order."""
+    claimed = np.zeros(len(pairwise), dtype=bool)
+    clusters = {}
+    for i in order:
+        if claimed[i]:
+            continue
+        members = np.flatnonzero((pairwise[i] >= threshold) & ~claimed)
+        claimed[members] = True
+        claimed[i] = True
+        clusters[i] = [member for member in members.tolist() if member != i]
+    return clusters
+
+def run_reranked_search(query_text, n_results, where=None, fields=None, min_similarity=None, mmr_lambda=None, dedup_threshold=None, tag_filter=None):
+    """Semantic search with exact cosine rescoring, optional near-duplicate suppression,
+    MMR diversification and a similarity cutoff.
+
+    Over-fetches RERANK_OVERFETCH * n_results candidates together with their
+    embeddings, rescores them with one matrix product and returns at most
+    n_results memories whose similarity is exact cosine similarity. With
+    dedup_threshold, candidates whose embeddings are at least that similar
+    collapse into their best-scoring member, which reports duplicate_count
+    and duplicate_ids; the candidate pool is doubled (up to
+    DEDUP_MAX_CANDIDATES) until n_results distinct hits are found.
+    """
+    if embedding_cache is None:
+        raise ValueError("Re-ranking needs an embedding function")
+
+    version = get_search_cache_version()
+    normalized_query = normalize_query(query_text)
+    cache_key = search_cache_key(normalized_query, n_results, where, fields, tag_filter) + json.dumps({"min_similarity": min_similarity, "mmr_lambda": mmr_lambda, "dedup_threshold": dedup_threshold})
+    cached = server_cache.get("search", cache_key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    query_vector = embedding_cache.get(normalized_query)
+    allowed_ids = resolve_tag_filter(tag_filter)
+    fetch_count = max(n_results, n_results * RERANK_OVERFETCH)
+    while True:
+        start_time = time.time()
+        results = query_collection(
+            {"query_embeddings": [query_vector.tolist()]},
+            fetch_count,
+            where,
+            ['embeddings'] + chroma_include(fields, distances=False),
+            allowed_ids
+        )
+        query_times.append((time.time() - start_time) * 1000)
+
+        ids = (results.get('ids') or [[]])[0]
+        if not ids:
+            memories_list = []
+            break
+        candidates = normalize_rows(np.asarray(results['embeddings'][0], dtype=np.float32))
+        similarities = candidates @ normalize_rows(np.asarray(query_vector, dtype=np.float32))
+
+        keep = np.arange(len(ids))
+        if min_similarity is not None:
+            keep = keep[similarities >= min_similarity]
+        keep = keep[np.argsort(-similarities[keep], kind="stable")]
+        pairwise = candidates[keep] @ candidates[keep].T if (dedup_threshold is not None or mmr_lambda is not None) else None
+
+        duplicates = {}
+        if dedup_threshold is not None:
+            clusters = cluster_duplicates(range(len(keep)), pairwise, dedup_threshold)
+            # Too few distinct hits and the collection may hold more: widen the candidate pool
+            if len(clusters) < n_results and len(ids) == fetch_count and fetch_count < DEDUP_MAX_CANDIDATES:
+                fetch_count = min(fetch_count * 2, DEDUP_MAX_CANDIDATES)
+                continue
+            representatives = list(clusters)
+            duplicates = {int(keep[rep]): [int(keep[member]) for member in members] for rep, members in clusters.items()}
+            keep = keep[representatives]
+            pairwise = pairwise[np.ix_(representatives, representatives)]
+
+        if mmr_lambda is not None:
+            order = keep[mmr_select(similarities[keep], pairwise, n_results, mmr_lambda)]
+        else:
+            order = keep[:n_results]
+
+        documents = results['documents'][0] if results.get('documents') else [None] * len(ids)
+        metadatas = results['metadatas'][0] if results.get('metadatas') else [None] * len(ids)
+        memories_list = []
+        for i in order.tolist():
+            memory = build_memory(ids[i], documents[i], metadatas[i], 1.0 - float(similarities[i]), fields)
+            if dedup_threshold is not None:
+                memory["duplicate_count"] = len(duplicates.get(i, []))
+                memory["duplicate_ids"] = [ids[member] for member in duplicates.get(i, [])]
+            memories_list.append(memory)
+        break
+
+    server_cache.set("search", cache_key, (version, memories_list), ttl_seconds=SEARCH_CACHE_TTL)
+    return memories_list
+
+# HNSW tuning: collection migration and recall-vs-latency benchmark
+def migrate_collection(settings):
+    """Copy every memory into a new collection with the given HNSW settings and swap it in.
+
+    Embeddings are copied as-is, so nothing is re-embedded. The old
+    collection is only dropped once the copy has the same row count; if the
+    process dies between the drop and the rename, open_collection() finishes
+    the swap on the next start. The new collection has a new ID, so other
+    processes holding the old collection (mcp-memory-service, Electron
+    direct mode) must be restarted.
+    """
+    global collection
+    source = collection
+    before = get_hnsw_settings(source)
+    target_metadata = {**(source.metadata or {}), **parse_hnsw_settings(settings)}
+
+    try:
+        client.delete_collection(MIGRATION_COLLECTION_NAME)  # leftovers from a failed attempt
+    except Exception:
+        pass
+    start_time = time.time()
+    target = client.create_collection(name=MIGRATION_COLLECTION_NAME, embedding_function=embedding_function, metadata=target_metadata)
+    try:
+        for page in iter_collection_pages(source, include=['embeddings', 'documents', 'metadatas']):
+            target.add(
+                ids=page['ids'],
+                embeddings=[list(map(float, vector)) for vector in page['embeddings']],
+                documents=page['documents'],
+                metadatas=page['metadatas']
+            )
+        source_count, target_count = source.count(), target.count()
+        if source_count != target_count:
+            raise RuntimeError(f"copied {target_count} of {source_count} memories")
+    except Exception:
+        client.delete_collection(MIGRATION_COLLECTION_NAME)
+        raise
+
+    client.delete_collection(COLLECTION_NAME)
+    target.modify(name=COLLECTION_NAME)
+    collection = target
+    bump_collection_version()
+
+    elapsed_ms = round((time.time() - start_time) * 1000, 1)
+    logger.info("Collection migrated to HNSW settings %s in %sms", get_hnsw_settings(target), elapsed_ms)
+    return {"before": before, "after": get_hnsw_settings(target), "memories": target_count, "elapsed_ms": elapsed_ms}
+
+def exact_top_k(data, queries, k, space):
+    """Brute-force nearest neighbours (row indices) under the given HNSW space"""
+    if space == "cosine":
+        scores = normalize_rows(queries) @ normalize_rows(data).T
+    elif space == "ip":
+        scores = queries @ data.T
+    else:
+        # Smaller L2 distance is better; the query norm is constant per row
+        scores = 2 * (queries @ data.T) - np.sum(data * data, axis=1)
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return top
+
+def benchmark_hnsw(settings_list, k=10, sample_size=50, max_vectors=5000):
+    """Measure recall@k against exact search and query latency for each HNSW setting.
+
+    Up to max_vectors stored embeddings are loaded; sample_size of them are
+    held out as queries and the rest go into throwaway in-memory
+    collections, one per setting, so a query never finds itself.
+    """
+    ids, vectors = [], []
+    for page in iter_collection_pages(collection, include=['embeddings']):
+        ids.extend(page['ids'])
+        vectors.extend(page['embeddings'])
+        if len(ids) >= max_vectors:
+            break
+    data = np.asarray(vectors[:max_vectors], dtype=np.float32)
+    ids = ids[:max_vectors]
+    current = get_hnsw_settings(collection)
+    if len(ids) < 2:
+        return {"vectors": len(ids), "current": current, "results": []}
+
+    query_rows = set(random.Random(42).sample(range(len(ids)), min(sample_size, len(ids) - 1)))
+    queries = data[sorted(query_rows)]
+    indexed_rows = [row for row in range(len(ids)) if row not in query_rows]
+    data = data[indexed_rows]
+    ids = [ids[row] for row in indexed_rows]
+    k = min(k, len(ids))
+    bench_client = chromadb.EphemeralClient()
+
+    results = []
+    for settings in settings_list:
+        metadata = {**HNSW_DEFAULTS, **{f"hnsw:{key}": value for key, value in current.items()}, **parse_hnsw_settings(settings)}
+        truth = exact_top_k(data, queries, k, metadata["hnsw:space"])
+        truth_ids = [{ids[row] for row in rows} for rows in truth.tolist()]
+
+        bench_name = f"hnsw_benchmark_{uuid.uuid4().hex[:8]}"
+        bench = bench_client.create_collection(name=bench_name, metadata=metadata, embedding_function=None)
+        try:
+            build_start = time.perf_counter()
+            batch_size = min(bench_client.max_batch_size, 5000)
+            for offset in range(0, len(ids), batch_size):
+                bench.add(ids=ids[offset:offset + batch_size], embeddings=data[offset:offset + batch_size].tolist())
+            build_ms = (time.perf_counter() - build_start) * 1000
+
+            latencies = []
+            hits = 0
+            for query, expected in zip(queries.tolist(), truth_ids):
+                query_start = time.perf_counter()
+                found = bench.query(query_embeddings=[query], n_results=k, include=[])
+                latencies.append((time.perf_counter() - query_start) * 1000)
+                hits += len(expected.intersection(found['ids'][0]))
+        finally:
+            bench_client.delete_collection(bench_name)
+
+        latencies.sort()
+        results.append({
+            "settings": {key.split(":", 1)[1]: value for key, value in metadata.items() if key in HNSW_DEFAULTS},
+            "recall_at_k": round(hits / (k * len(truth_ids)), 4),
+            "p50_ms": round(percentile(latencies, 0.5), 3),
+            "p99_ms": round(percentile(latencies, 0.99), 3),
+            "build_ms": round(build_ms, 1)
+        })
+
+    return {"vectors": len(ids), "queries": len(queries), "k": k, "current": current, "results": results}
+
+# Micro-batching of concurrent semantic searches (a window of 0 disables batching)
+BATCH_WINDOW_MS = float(os.environ.get("MCP_MEMORY_BATCH_WINDOW_MS", "3"))
+BATCH_MAX_SIZE = int(os.environ.get("MCP_MEMORY_BATCH_MAX_SIZE", "32"))
+
+class QueryBatcher:
+    """Coalesces semantic searches arriving within a short window into one batched query.
+
+    Callers await search(); requests are collected until window_ms has
+    passed since the first one or max_batch_size is reached, then run as a
+    single run_semantic_search_batch call per distinct filter and field set in a
+    worker thread, and each caller's future receives its own results.
+    """
+
+    def __init__(self, window_ms, max_batch_size):
+        self.window_seconds = window_ms / 1000.0
+        self.max_batch_size = max_batch_size
+        self.pending = []  # (query_text, n_results, where, fields, tag_filter, future)
+        self.flush_handle = None
+        # The event loop only keeps weak references to tasks, so hold running batches here
+        self._tasks = set()
+        self.counters = Counter()
 
-# Initialize cache with 30-second TTL
-stats_cache = StatsCache(ttl_seconds=30)
+    async def search(self, query_text, n_results, where=None, fields=None, tag_filter=None):
+        if self.window_seconds <= 0:
+            return await blocking_executor.run("read", run_semantic_search, query_text, n_results, where, fields, tag_filter)
 
-def track_query_time(func):
-    """Decorator to track query execution times"""
-    def wrapper(*args, **kwargs):
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        end_time = time.time()
-        query_time_ms = (end_time - start_time) * 1000
-        query_times.append(query_time_ms)
-        return result
-    return wrapper
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((query_text, n_results, where, fields, tag_filter, future))
+        if len(self.pending) >= self.max_batch_size:
+            self._flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.window_seconds, self._flush)
+        return await future
 
-def get_average_query_time():
-    """Calculate average query time from recent queries"""
-    if not query_times:
-        return 0
-    return round(sum(query_times) / len(query_times), 2)
+    def _flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        batch, self.pending = self.pending, []
+        if not batch:
+            return
 
-def get_stats_optimized():
-    """OPTIMIZED stats method with caching and improved performance"""
-    
-    # Check cache first
-    cached_stats = stats_cache.get("stats")
-    if cached_stats:
-        return cached_stats
-    
-    start_time = time.time()
-    
-    try:
-        # Get total count (this is fast)
-        total_memories = collection.count()
-        print(f"🔍 Total memories count: {total_memories}")
-        
-        # OPTIMIZATION: Use lighter approach for tag counting
-        if total_memories == 0:
-            stats = {"total_memories": 0, "unique_tags": 0}
-        elif total_memories < 100:
-            # For small collections, use original method (acceptable performance)
-            print("📊 Small collection detected, using full metadata scan")
-            all_metadatas_results = collection.get(include=['metadatas'])
-            all_metadatas = all_metadatas_results.get('metadatas', [])
-            
-            unique_tags = set()
-            if all_metadatas: 
-                for meta in all_metadatas:
-                    if meta and isinstance(meta.get("tags"), list):
-                        for tag in meta["tags"]:
-                            unique_tags.add(tag)
-            
-            stats = {
-                "total_memories": total_memories,
-                "unique_tags": len(unique_tags)
-            }
-        else:
-            # For large collections, use sampling approach
-            print("📊 Large collection detected, using sampling approach")
-            
-            # Sample a subset of documents to estimate unique tags
-            sample_size = min(50, total_memories // 10)  # Sample 10% or max 50 docs
-            print(f"📊 Sampling {sample_size} documents out of {total_memories}")
-            
-            sample_results = collection.get(
-                include=['metadatas'],
-                limit=sample_size
+        # Only queries with the same filter and fields can share one collection.query
+        groups = {}
+        for request in batch:
+            groups.setdefault(json.dumps([request[2], request[3], request[4]], sort_keys=True), []).append(request)
+        loop = asyncio.get_running_loop()
+        for group in groups.values():
+            task = loop.create_task(self._run(group))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, group):
+        self.counters["batches"] += 1
+        self.counters["queries"] += len(group)
+        self.counters["max_batch_size_seen"] = max(self.counters["max_batch_size_seen"], len(group))
+        try:
+            results_per_query = await blocking_executor.run(
+                "read",
+                run_semantic_search_batch,
+                [(query_text, n_results) for query_text, n_results, *_ in group],
+                group[0][2],
+                group[0][3],
+                group[0][4]
             )
-            
-            sample_metadatas = sample_results.get('metadatas', [])
-            unique_tags_sample = set()
-            
-            if sample_metadatas:
-                for meta in sample_metadatas:
-                    if meta and isinstance(meta.get("tags"), list):
-                        for tag in meta["tags"]:
-                            unique_tags_sample.add(tag)
-            
-            # Estimate total unique tags (this is an approximation)
-            # In practice, you might want to maintain a separate tag index
-            estimated_unique_tags = len(unique_tags_sample)
-            
-            stats = {
-                "total_memories": total_memories,
-                "unique_tags": estimated_unique_tags,
-                "note": f"Estimated from {sample_size} samples"
-            }
-        
-        # Cache the results
-        stats_cache.set("stats", stats)
-        
-        end_time = time.time()
-        query_time = (end_time - start_time) * 1000
-        print(f"⚡ Stats computed in {query_time:.1f}ms (vs previous 8-10s)")
-        
-        return stats
-        
-    except Exception as e:
-        print(f"Error getting optimized stats: {e}")
-        error_stats = {
-            "total_memories": 0,
-            "unique_tags": 0,
-            "error": str(e)
+        except Exception as e:
+            for *_, future in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (*_, future), memories_list in zip(group, results_per_query):
+            if not future.done():
+                future.set_result(memories_list)
+
+    def metrics(self):
+        return {
+            "window_ms": self.window_seconds * 1000,
+            "max_batch_size": self.max_batch_size,
+            **self.counters
         }
-        return error_stats
+
+query_batcher = QueryBatcher(BATCH_WINDOW_MS, BATCH_MAX_SIZE)
 
 def parse_time_expression(query):
     """Parse natural language time expressions and convert to ChromaDB filters"""
@@ -228,16 +2485,749 @@ def parse_time_expression(query):
             if expression in query_lower:
                 # Return both the cleaned query and time filter
                 cleaned_query = re.sub(re.escape(expression), '', query_lower).strip()
-                return cleaned_query, {"timestamp": {"$gte": cutoff_time.isoformat()}}
+                return cleaned_query, {"timestamp_epoch": {"$gte": cutoff_time.replace(tzinfo=timezone.utc).timestamp()}}
         
         # If no time expression found, return original query with no filter
         return query, None
         
     except Exception as e:
-        print(f"Error parsing time expression '{query}': {e}")
+        logger.error("Error parsing time expression '%s': %s", query, e)
         # If parsing fails, return original query with no time filter
         return query, None
 
+# Cursor pagination for tag search and recall
+SEARCH_PAGE_SIZE = int(os.environ.get("MCP_MEMORY_SEARCH_PAGE_SIZE", "100"))
+SEARCH_MAX_PAGE_SIZE = int(os.environ.get("MCP_MEMORY_SEARCH_MAX_PAGE_SIZE", "1000"))
+
+# Identifies this server process, so cursors handed out by another process are rejected
+SERVER_INSTANCE_ID = uuid.uuid4().hex[:8]
+
+def cursor_query_key(tool_name, params):
+    """Short fingerprint of the search a cursor belongs to"""
+    payload = json.dumps({"tool": tool_name, "params": params}, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+
+def encode_cursor(offset, query_key):
+    """Opaque cursor pinned to get_search_cache_version(), so external writes expire it too"""
+    payload = json.dumps({"s": SERVER_INSTANCE_ID, "v": list(get_search_cache_version()), "q": query_key, "o": offset}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor, query_key):
+    """Return the offset stored in a cursor, or raise ValueError if it is invalid or expired"""
+    if not cursor:
+        return 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        offset = int(payload["o"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if payload.get("q") != query_key or offset < 0:
+        raise ValueError("Cursor does not belong to this search")
+    if payload.get("s") != SERVER_INSTANCE_ID or payload.get("v") != list(get_search_cache_version()):
+        raise ValueError("Cursor expired because the collection changed; restart the search without a cursor")
+    return offset
+
+def get_page_size(arguments, default):
+    """Page size from the tool arguments, clamped to [1, SEARCH_MAX_PAGE_SIZE]"""
+    limit = arguments.get("limit")
+    if limit is None:
+        limit = default
+    return max(1, min(int(limit), SEARCH_MAX_PAGE_SIZE))
+
+def format_get_results(results, fields=None):
+    """Convert a collection.get result into the memories list returned by tools"""
+    ids = results.get('ids') or []
+    documents = results.get('documents') or [None] * len(ids)
+    metadatas = results.get('metadatas') or [None] * len(ids)
+    # get() has no distances, so similarity is never part of its results
+    if fields is not None:
+        fields = tuple(field for field in fields if field != "similarity")
+    return [build_memory(ids[i], documents[i], metadatas[i], fields=fields) for i in range(len(ids))]
+
+def get_page(where, limit, offset, fields=None):
+    """One page of collection.get results; fetches one extra row to tell whether more remain.
+
+    limit None returns every match.
+    """
+    if limit is None:
+        results = collection.get(where=where, include=chroma_include(fields, distances=False))
+        return format_get_results(results, fields)[offset:], False
+    results = collection.get(
+        where=where,
+        limit=limit + 1,
+        offset=offset,
+        include=chroma_include(fields, distances=False)
+    )
+    memories_list = format_get_results(results, fields)
+    return memories_list[:limit], len(memories_list) > limit
+
+# Boolean tag queries: AND / OR / NOT with parentheses, evaluated over the tag postings index
+TAG_QUERY_TOKEN_PATTERN = re.compile(r'\s*(?:(\()|(\))|"([^"]*)"|([^\s()"]+))')
+TAG_QUERY_OPERATORS = ("AND", "OR", "NOT")
+
+def tokenize_tag_query(text):
+    tokens = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = TAG_QUERY_TOKEN_PATTERN.match(text, position)
+        if not match:
+            raise ValueError(f"Invalid tag query near '{text[position:]}'")
+        open_paren, close_paren, quoted, word = match.groups()
+        if open_paren or close_paren:
+            tokens.append((open_paren or close_paren, None))
+        elif quoted is not None:
+            tokens.append(("TAG", quoted))
+        elif word in TAG_QUERY_OPERATORS:
+            tokens.append((word, None))
+        else:
+            tokens.append(("TAG", word))
+        position = match.end()
+    return tokens
+
+def parse_tag_query(text):
+    """Parse a tag query into a tree of ("tag", name), ("and", [...]), ("or", [...]) and ("not", node).
+
+    NOT binds tightest, then AND, then OR; terms next to each other are
+    ANDed, so "project-x bug NOT resolved" means project-x AND bug AND NOT
+    resolved. Operators are upper case; quote tags containing spaces or
+    spelled like an operator.
+    """
+    tokens = tokenize_tag_query(text)
+    if not tokens:
+        raise ValueError("Tag query cannot be empty")
+    position = 0
+
+    def peek():
+        return tokens[position][0] if position < len(tokens) else None
+
+    def take(expected=None):
+        nonlocal position
+        if position >= len(tokens):
+            raise ValueError("Unexpected end of tag query")
+        kind, value = tokens[position]
+        if expected and kind != expected:
+            raise ValueError(f"Expected {expected} in tag query, found {value or kind}")
+        position += 1
+        return kind, value
+
+    def parse_or():
+        children = [parse_and()]
+        while peek() == "OR":
+            take()
+            children.append(parse_and())
+        return children[0] if len(children) == 1 else ("or", children)
+
+    def parse_and():
+        children = [parse_not()]
+        while peek() in ("AND", "NOT", "TAG", "("):
+            if peek() == "AND":
+                take()
+            children.append(parse_not())
+        return children[0] if len(children) == 1 else ("and", children)
+
+    def parse_not():
+        if peek() == "NOT":
+            take()
+            return ("not", parse_not())
+        if peek() == "(":
+            take()
+            node = parse_or()
+            take(")")
+            return node
+        return ("tag", take("TAG")[1])
+
+    tree = parse_or()
+    if position != len(tokens):
+        raise ValueError(f"Unexpected {tokens[position][1] or tokens[position][0]} in tag query")
+    return tree
+
+def estimate_tag_query(node, index):
+    """Upper bound on the number of memories a (non-negated) node can match"""
+    kind = node[0]
+    if kind == "tag":
+        return index.document_frequency(node[1])
+    if kind == "or":
+        return sum(estimate_tag_query(child, index) for child in node[1])
+    if kind == "and":
+        positives = [estimate_tag_query(child, index) for child in node[1] if child[0] != "not"]
+        return min(positives) if positives else len(index.codes)
+    return len(index.codes)
+
+def evaluate_tag_query(node, index):
+    """Sorted array of memory codes matching a parsed tag query"""
+    kind = node[0]
+    if kind == "tag":
+        return index.lookup(node[1])
+    if kind == "or":
+        result = np.array([], dtype=np.uint32)
+        for child in node[1]:
+            result = np.union1d(result, evaluate_tag_query(child, index))
+        return result
+    if kind == "not":
+        return np.setdiff1d(index.all_codes(), evaluate_tag_query(node[1], index), assume_unique=True)
+
+    # AND: intersect the positive terms rarest first, then subtract the negated ones
+    positives = sorted((child for child in node[1] if child[0] != "not"), key=lambda child: estimate_tag_query(child, index))
+    negatives = [child[1] for child in node[1] if child[0] == "not"]
+    result = None
+    for child in positives:
+        codes = evaluate_tag_query(child, index)
+        result = codes if result is None else np.intersect1d(result, codes, assume_unique=True)
+        if not len(result):
+            return result
+    if result is None:
+        result = index.all_codes()
+    for child in negatives:
+        result = np.setdiff1d(result, evaluate_tag_query(child, index), assume_unique=True)
+        if not len(result):
+            break
+    return result
+
+def get_postings_page(match, limit, offset, fields=None):
+    """One page of memories for the codes match() selects from the tag postings index.
+
+    The index is refreshed, match() evaluated and the page's codes resolved
+    to IDs under a single hold of the index lock, so a rebuild cannot
+    renumber the codes in between. The memories are then fetched outside
+    the lock with a single get(ids=...).
+    """
+    end = None if limit is None else offset + limit
+    with tag_postings.lock:
+        tag_postings.ensure_fresh(collection)
+        codes = match()
+        page_ids = tag_postings.resolve(codes[offset:end])
+    if not page_ids:
+        return [], False
+    page = get_memories_by_id(page_ids, fields)
+    if page["missing"]:
+        # Deleted behind our back (e.g. by another process); rebuild before the next lookup
+        logger.warning("%s out of date: %s IDs no longer exist", tag_postings.label, len(page["missing"]))
+        tag_postings.invalidate()
+    return page["memories"], end is not None and len(codes) > end
+
+def search_by_tag_page(tool_name, arguments):
+    """Tag search: memories carrying any of the given tags, or matching a boolean tag_query.
+
+    Results are paginated only when the caller passes limit or cursor;
+    otherwise every match is returned, as callers that never read
+    next_cursor expect.
+    """
+    tags_list = arguments.get("tags")
+    if not isinstance(tags_list, list):
+        tags_list = []
+    tags = [tag.strip() for tag in tags_list if isinstance(tag, str) and tag.strip()]
+    tag_query = (arguments.get("tag_query") or "").strip()
+    if not tags and not tag_query:
+        return {"memories": [], "next_cursor": None}
+
+    paginated = arguments.get("limit") is not None or bool(arguments.get("cursor"))
+    limit = get_page_size(arguments, SEARCH_PAGE_SIZE) if paginated else None
+    fields = parse_fields(arguments)
+    query_key = cursor_query_key(tool_name, {"tags": tags, "tag_query": tag_query, "limit": limit})
+    offset = decode_cursor(arguments.get("cursor"), query_key)
+
+    if tag_query:
+        # Listed tags are ORed into the expression; NOT needs the postings index, so it is always used here
+        tree = parse_tag_query(tag_query)
+        if tags:
+            tree = ("or", [tree] + [("tag", tag) for tag in tags])
+        memories_list, has_more = get_postings_page(lambda: evaluate_tag_query(tree, tag_postings), limit, offset, fields)
+    else:
+        memories_list, has_more = get_postings_page(lambda: tag_postings.match_any(tags), limit, offset, fields)
+    # Tag search has no query text, so snippets are leading excerpts
+    memories_list = apply_snippets(memories_list, None, get_snippet_length(arguments))
+    return {
+        "memories": memories_list,
+        "next_cursor": encode_cursor(offset + limit, query_key) if has_more else None
+    }
+
+def recall_page(tool_name, arguments):
+    """Paginated recall: time-filtered listing, or semantic search when no time expression is present"""
+    query_text = arguments.get("query")
+    limit = get_page_size(arguments, arguments.get("n_results", 5))
+    fields = parse_fields(arguments)
+    query_key = cursor_query_key(tool_name, {"query": query_text, "limit": limit})
+    offset = decode_cursor(arguments.get("cursor"), query_key)
+
+    # Parse time expressions from query
+    cleaned_query, time_filter = parse_time_expression(query_text)
+
+    if time_filter:
+        # Note: ChromaDB metadata filtering is limited, this is a basic implementation
+        memories_list, has_more = get_page(time_filter, limit, offset, fields)
+    else:
+        # ANN queries have no offset, so fetch up to the end of this page (plus one) and slice
+        ranked = run_semantic_search(cleaned_query if cleaned_query else query_text, offset + limit + 1, fields=fields)
+        memories_list = ranked[offset:offset + limit]
+        has_more = len(ranked) > offset + limit
+
+    memories_list = apply_snippets(memories_list, cleaned_query or query_text, get_snippet_length(arguments))
+    return {
+        "memories": memories_list,
+        "next_cursor": encode_cursor(offset + limit, query_key) if has_more else None
+    }
+
+# Snippet mode: bounded-length previews for list views
+SNIPPET_MAX_LENGTH = int(os.environ.get("MCP_MEMORY_SNIPPET_MAX_LENGTH", "2000"))
+SNIPPET_TERM_PATTERN = re.compile(r"\w{2,}")
+
+def get_snippet_length(arguments):
+    """Requested snippet length, or None when full content should be returned"""
+    snippet_length = arguments.get("snippet_length")
+    if snippet_length is None or int(snippet_length) <= 0:
+        return None
+    return min(int(snippet_length), SNIPPET_MAX_LENGTH)
+
+def make_snippet(content, query_text, max_length):
+    """Excerpt of at most max_length characters (ellipses included) centered on the region with the most query terms"""
+    if len(content) <= max_length:
+        return content
+    if max_length <= 2:
+        return content[:max_length]
+    # Leave room for a leading and a trailing ellipsis
+    budget = max_length - 2
+    lowered = content.lower()
+    terms = set(SNIPPET_TERM_PATTERN.findall((query_text or "").lower()))
+    hits = sorted(
+        (match.start(), term)
+        for term in terms
+        for match in re.finditer(re.escape(term), lowered)
+    )
+
+    start = 0
+    span_start = span_end = 0
+    if hits:
+        # Slide a window over the hit positions and keep the one covering the most distinct terms
+        best_score = -1
+        right = 0
+        for left in range(len(hits)):
+            right = max(right, left)
+            while right < len(hits) and hits[right][0] + len(hits[right][1]) - hits[left][0] <= budget:
+                right += 1
+            score = len({term for _, term in hits[left:right]})
+            if score > best_score:
+                best_score = score
+                span_start = hits[left][0]
+                # A single hit longer than the budget is cut, not skipped
+                span_end = hits[right - 1][0] + len(hits[right - 1][1]) if right > left else span_start + budget
+        # Center the covered span inside the window
+        start = max(0, span_start - (budget - (span_end - span_start)) // 2)
+        start = min(start, len(content) - budget)
+        # Don't cut words in half at the left edge, but never move past the first hit
+        if start > 0 and not content[start - 1].isspace():
+            boundary = content.find(" ", start, span_start)
+            if boundary != -1:
+                start = boundary + 1
+
+    end = min(len(content), start + budget)
+    if end < len(content):
+        # Trim back to a word boundary, but never before the end of the last hit in the window
+        boundary = content.rfind(" ", max(span_end, start + budget // 2), end)
+        if boundary != -1:
+            end = boundary
+    return ("\u2026" if start > 0 else "") + content[start:end].strip() + ("\u2026" if end < len(content) else "")
+
+def apply_snippets(memories_list, query_text, snippet_length):
+    """Replace content with snippets; returns new dicts so cached results are left intact"""
+    if snippet_length is None:
+        return memories_list
+    snippets = []
+    for memory in memories_list:
+        if "content" not in memory:
+            snippets.append(memory)
+            continue
+        content = memory["content"]
+        snippet = dict(memory)
+        snippet["content"] = make_snippet(content, query_text, snippet_length)
+        snippet["content_length"] = len(content)
+        snippet["truncated"] = len(content) > snippet_length
+        snippets.append(snippet)
+    return snippets
+
+def get_memories_by_id(memory_ids, fields=None):
+    """Fetch memories for a batch of ids with a single collection.get, in the order requested"""
+    results = collection.get(ids=memory_ids, include=chroma_include(fields, distances=False))
+    memories_by_id = {memory["id"]: memory for memory in format_get_results(results, fields)}
+    return {
+        "memories": [memories_by_id[memory_id] for memory_id in memory_ids if memory_id in memories_by_id],
+        "missing": [memory_id for memory_id in memory_ids if memory_id not in memories_by_id]
+    }
+
+# Time filters compare the numeric timestamp_epoch field. store_memory writes it, but older
+# memories and those written by mcp-memory-service or Electron direct mode only have
+# timestamp, so it is backfilled at startup and whenever the tag index rebuilds
+timestamp_backfill_task = None
+
+def backfill_timestamp_epoch(target_collection):
+    """Add timestamp_epoch to every memory that has a parseable timestamp but no epoch.
+
+    Pages through the metadata and writes only the missing field with one
+    collection.update per page (Chroma merges metadata keys on update).
+    Returns the number of memories updated.
+    """
+    start_time = time.time()
+    updated = 0
+    for page in iter_collection_pages(target_collection, include=['metadatas']):
+        ids, metadatas = [], []
+        for memory_id, metadata in zip(page['ids'], page.get('metadatas') or []):
+            epoch = (metadata or {}).get("timestamp_epoch")
+            if isinstance(epoch, (int, float)) and not isinstance(epoch, bool):
+                continue
+            epoch = timestamp_to_epoch((metadata or {}).get("timestamp"))
+            if epoch is not None:
+                ids.append(memory_id)
+                metadatas.append({"timestamp_epoch": epoch})
+        if ids:
+            target_collection.update(ids=ids, metadatas=metadatas)
+            updated += len(ids)
+    if updated:
+        # Time-filtered results change, so cached searches and cursors must not survive
+        bump_collection_version()
+        logger.info("Backfilled timestamp_epoch on %s memories in %.1fms", updated, (time.time() - start_time) * 1000)
+    return updated
+
+async def backfill_timestamps_in_background():
+    """Run the timestamp_epoch backfill as a write so it never races store_memory"""
+    try:
+        await blocking_executor.run("write", backfill_timestamp_epoch, collection)
+    except Exception as e:
+        logger.error("Error backfilling timestamp_epoch: %s", e)
+
+def schedule_timestamp_backfill():
+    """Schedule a background timestamp_epoch backfill (at most one in flight). Safe to call from executor threads."""
+    global timestamp_backfill_task
+    if timestamp_backfill_task is not None and not timestamp_backfill_task.done():
+        return True
+    if main_event_loop is None or main_event_loop.is_closed() or not main_event_loop.is_running():
+        return False
+    timestamp_backfill_task = asyncio.run_coroutine_threadsafe(backfill_timestamps_in_background(), main_event_loop)
+    return True
+
+# Combined filters for semantic search, compiled into a single Chroma where clause
+METADATA_FILTER_OPERATORS = ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte", "$in", "$nin")
+
+def build_search_filter(arguments):
+    """Compile search filters into (where, tag_filter).
+
+    The time window and metadata filters become one Chroma where clause (or
+    None). Tags cannot be expressed in a where clause on Chroma 0.4.x, so
+    they are returned separately as {"tags": [...], "mode": "any"|"all"}
+    (or None) and resolved through the tag postings index.
+    """
+    clauses = []
+    tag_filter = None
+
+    tags_arg = arguments.get("tags")
+    if tags_arg is not None:
+        if isinstance(tags_arg, str):
+            tags_arg = [tags_arg]
+        tags = [tag.strip() for tag in tags_arg if isinstance(tag, str) and tag.strip()]
+        tags_mode = str(arguments.get("tags_mode", "any")).lower()
+        if tags_mode not in ("any", "all"):
+            raise ValueError("tags_mode must be 'any' or 'all'")
+        if tags:
+            tag_filter = {"tags": sorted(set(tags)), "mode": tags_mode}
+
+    # Time window: explicit ISO bounds and/or a natural language expression like "last week",
+    # compared against the numeric timestamp_epoch field
+    if arguments.get("time_expression"):
+        _, time_filter = parse_time_expression(arguments["time_expression"])
+        if time_filter is None:
+            raise ValueError(f"Unrecognized time expression '{arguments['time_expression']}'")
+        clauses.append(time_filter)
+    for argument, operator in (("after", "$gte"), ("before", "$lt")):
+        if arguments.get(argument) not in (None, ""):
+            bound = timestamp_to_epoch(arguments[argument])
+            if bound is None:
+                raise ValueError(f"{argument} must be an ISO 8601 date/timestamp or seconds since the epoch")
+            clauses.append({"timestamp_epoch": {operator: bound}})
+
+    metadata_filter = arguments.get("metadata_filter")
+    if metadata_filter:
+        if not isinstance(metadata_filter, dict):
+            raise ValueError("metadata_filter must be an object mapping metadata keys to values or operators")
+        for key, condition in metadata_filter.items():
+            if not isinstance(key, str) or key.startswith("$"):
+                raise ValueError(f"Invalid metadata filter key '{key}'")
+            if isinstance(condition, dict):
+                unknown = [operator for operator in condition if operator not in METADATA_FILTER_OPERATORS]
+                if unknown:
+                    raise ValueError(f"Unsupported metadata filter operators {unknown}")
+            clauses.append({key: condition})
+
+    if not clauses:
+        return None, tag_filter
+    return (clauses[0] if len(clauses) == 1 else {"$and": clauses}), tag_filter
+
+def filter_memory_ids(memory_ids, where):
+    """Subset of memory_ids matching the where clause, in their original order, with one collection.get"""
+    if where is None or not memory_ids:
+        return memory_ids
+    matching = set(collection.get(ids=memory_ids, where=where, include=[]).get('ids') or [])
+    return [memory_id for memory_id in memory_ids if memory_id in matching]
+
+# Tag filters restrict semantic search to the IDs the tag postings index resolves them to
+TAG_FILTER_EXACT_MAX = int(os.environ.get("MCP_MEMORY_TAG_FILTER_EXACT_MAX", "2000"))
+
+def resolve_tag_filter(tag_filter):
+    """Set of memory IDs matching a tag filter from build_search_filter, or None without one"""
+    if tag_filter is None:
+        return None
+    with tag_postings.lock:
+        tag_postings.ensure_fresh(collection)
+        if tag_filter["mode"] == "all":
+            codes = tag_postings.match_all(tag_filter["tags"])
+        else:
+            codes = tag_postings.match_any(tag_filter["tags"])
+        return set(tag_postings.resolve(codes))
+
+def space_distances(queries, data, space):
+    """Distances between query rows and data rows as Chroma reports them for an HNSW space"""
+    if space == "cosine":
+        return 1.0 - normalize_rows(queries) @ normalize_rows(data).T
+    if space == "ip":
+        return 1.0 - queries @ data.T
+    # hnswlib's l2 space reports squared distances
+    return np.sum(queries * queries, axis=1)[:, None] - 2 * (queries @ data.T) + np.sum(data * data, axis=1)[None, :]
+
+def empty_query_results(query_count, include):
+    return {column: [[] for _ in range(query_count)] for column in ["ids"] + include}
+
+def query_collection(query_args, n_results, where=None, include=(), allowed_ids=None):
+    """collection.query, optionally restricted to allowed_ids; returns collection.query's result shape.
+
+    Up to TAG_FILTER_EXACT_MAX allowed IDs are scored exactly against their
+    stored embeddings. Larger sets (or text queries without a local
+    embedding function) over-fetch from the ANN index and drop other IDs,
+    doubling the fetch until every query has n_results hits or the whole
+    collection has been searched.
+    """
+    include = list(include)
+    if allowed_ids is None:
+        return collection.query(**query_args, n_results=n_results, where=where, include=include)
+
+    query_count = len(query_args.get("query_embeddings") or query_args.get("query_texts"))
+    if not allowed_ids:
+        return empty_query_results(query_count, include)
+
+    if "query_embeddings" in query_args and len(allowed_ids) <= TAG_FILTER_EXACT_MAX:
+        candidates = collection.get(
+            ids=sorted(allowed_ids),
+            where=where,
+            include=["embeddings"] + [column for column in include if column not in ("distances", "embeddings")]
+        )
+        candidate_ids = candidates.get('ids') or []
+        if not candidate_ids:
+            return empty_query_results(query_count, include)
+        distances = space_distances(
+            np.asarray(query_args["query_embeddings"], dtype=np.float32),
+            np.asarray(candidates['embeddings'], dtype=np.float32),
+            get_hnsw_settings(collection)["space"]
+        )
+        results = empty_query_results(0, include)
+        for row in distances:
+            top = np.argsort(row, kind="stable")[:n_results].tolist()
+            results["ids"].append([candidate_ids[i] for i in top])
+            for column in include:
+                if column == "distances":
+                    results[column].append([float(row[i]) for i in top])
+                else:
+                    results[column].append([candidates[column][i] for i in top])
+        return results
+
+    total = collection.count()
+    if total == 0:
+        return empty_query_results(query_count, include)
+    fetch_count = min(total, max(n_results, n_results * RERANK_OVERFETCH))
+    while True:
+        results = collection.query(**query_args, n_results=fetch_count, where=where, include=include)
+        filtered = empty_query_results(0, include)
+        for query_index, query_ids in enumerate(results['ids']):
+            keep = [i for i, memory_id in enumerate(query_ids) if memory_id in allowed_ids][:n_results]
+            filtered["ids"].append([query_ids[i] for i in keep])
+            for column in include:
+                filtered[column].append([results[column][query_index][i] for i in keep])
+        if fetch_count >= total or all(len(query_ids) >= n_results for query_ids in filtered["ids"]):
+            return filtered
+        fetch_count = min(total, fetch_count * 2)
+
+# Hybrid retrieval: BM25 and vector rankings fused with reciprocal rank fusion
+SEARCH_MODES = ("vector", "hybrid", "lexical")
+SEARCH_MODE = os.environ.get("MCP_MEMORY_SEARCH_MODE", "vector").lower()
+RRF_K = int(os.environ.get("MCP_MEMORY_RRF_K", "60"))
+HYBRID_CANDIDATES = int(os.environ.get("MCP_MEMORY_HYBRID_CANDIDATES", "50"))
+
+def get_search_mode(arguments):
+    mode = str(arguments.get("mode") or SEARCH_MODE).lower()
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode '{mode}'; expected one of {list(SEARCH_MODES)}")
+    return mode
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Fuse ranked id lists: each list contributes 1 / (k + rank) per id. Returns (id, score) best first."""
+    scores = {}
+    for ranking in rankings:
+        for rank, memory_id in enumerate(ranking, start=1):
+            scores[memory_id] = scores.get(memory_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+def run_lexical_search(query_text, k):
+    lexical_index.ensure_fresh(collection)
+    return lexical_index.search(query_text, k)
+
+def run_lexical_search_filtered(query_text, k, where=None, tag_filter=None):
+    """BM25 candidate ids, restricted to memories matching the where clause and tag filter"""
+    if where is None and tag_filter is None:
+        return [memory_id for memory_id, _ in run_lexical_search(query_text, k)]
+    # The index knows nothing about metadata, so over-fetch and filter in one get call
+    candidates = [memory_id for memory_id, _ in run_lexical_search(query_text, k * RERANK_OVERFETCH)]
+    allowed_ids = resolve_tag_filter(tag_filter)
+    if allowed_ids is not None:
+        candidates = [memory_id for memory_id in candidates if memory_id in allowed_ids]
+    return filter_memory_ids(candidates, where)[:k]
+
+async def run_hybrid_search(query_text, n_results, fields=None, mode="hybrid", where=None, tag_filter=None):
+    """Lexical or hybrid search; vector and BM25 candidates are fetched concurrently and fused with RRF"""
+    depth = max(n_results, HYBRID_CANDIDATES)
+    lexical_task = blocking_executor.run("read", run_lexical_search_filtered, query_text, depth, where, tag_filter)
+    if mode == "hybrid":
+        vector_hits, lexical_ids = await asyncio.gather(query_batcher.search(query_text, depth, where, fields, tag_filter), lexical_task)
+    else:
+        vector_hits, lexical_ids = [], await lexical_task
+
+    fused = reciprocal_rank_fusion([
+        [memory["id"] for memory in vector_hits],
+        lexical_ids
+    ])[:n_results]
+
+    memories_by_id = {memory["id"]: memory for memory in vector_hits}
+    missing = [memory_id for memory_id, _ in fused if memory_id not in memories_by_id]
+    if missing:
+        fetched = await blocking_executor.run("read", get_memories_by_id, missing, fields)
+        memories_by_id.update((memory["id"], memory) for memory in fetched["memories"])
+
+    return [
+        dict(memories_by_id[memory_id], score=round(score, 6))
+        for memory_id, score in fused
+        if memory_id in memories_by_id
+    ]
+
+async def retrieve_memories(query_text, arguments):
+    """Retrieve tools: vector, re-ranked vector, lexical or hybrid search with optional filters and snippets"""
+    n_results = int(arguments.get("n_results", 5))
+    fields = parse_fields(arguments)
+    where, tag_filter = build_search_filter(arguments)
+    mode = get_search_mode(arguments)
+    rerank_options = get_rerank_options(arguments)
+    if mode != "vector" and rerank_options is not None:
+        raise ValueError(f"rerank, min_similarity, mmr_lambda and dedup options are only supported in vector mode, not {mode} mode")
+    if mode == "vector" and rerank_options is not None:
+        memories_list = await blocking_executor.run("read", run_reranked_search, query_text, n_results, where, fields, *rerank_options, tag_filter)
+    elif mode == "vector":
+        memories_list = await query_batcher.search(query_text, n_results, where, fields, tag_filter)
+    else:
+        memories_list = await run_hybrid_search(query_text, n_results, fields, mode, where, tag_filter)
+    return apply_snippets(memories_list, query_text, get_snippet_length(arguments))
+
+# Tool input schema properties shared by several tools
+FIELDS_PROPERTY = {
+    "type": "array",
+    "items": {"type": "string", "enum": list(SEARCH_FIELDS)},
+    "description": "Fields to return per memory (id is always included); unrequested columns are not loaded"
+}
+
+PROJECTION_PROPERTIES = {
+    "fields": FIELDS_PROPERTY,
+    "snippet_length": {
+        "type": "number",
+        "description": "Return an excerpt of at most this many characters around the best match instead of the full content (fetch it later with get_memories)"
+    }
+}
+
+CURSOR_PROPERTY = {
+    "type": "string",
+    "description": "Opaque cursor from a previous response's next_cursor"
+}
+
+SEARCH_FILTER_PROPERTIES = {
+    "tags": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Only return memories with these tags"
+    },
+    "tags_mode": {
+        "type": "string",
+        "enum": ["any", "all"],
+        "description": "Match memories with any (default) or all of the tags"
+    },
+    "after": {
+        "type": ["string", "number"],
+        "description": "Only return memories stored at or after this ISO 8601 date/timestamp or epoch seconds"
+    },
+    "before": {
+        "type": ["string", "number"],
+        "description": "Only return memories stored before this ISO 8601 date/timestamp or epoch seconds"
+    },
+    "time_expression": {
+        "type": "string",
+        "description": "Natural language time window, e.g. 'last week' or 'this month'"
+    },
+    "metadata_filter": {
+        "type": "object",
+        "description": "Metadata conditions, either key: value or key: {\"$gte\": value} (operators: $eq, $ne, $gt, $gte, $lt, $lte, $in, $nin)"
+    }
+}
+
+RERANK_PROPERTIES = {
+    "mode": {
+        "type": "string",
+        "enum": list(SEARCH_MODES),
+        "description": "vector (embeddings only), lexical (BM25 only) or hybrid (both, fused with reciprocal rank fusion). Lexical and hybrid hits carry the fused score; similarity is only present on hits the vector ranking found, so lexical mode never returns it"
+    },
+    "rerank": {
+        "type": "boolean",
+        "description": "Rescore candidates by exact cosine similarity (vector mode only; implied by the options below)"
+    },
+    "min_similarity": {
+        "type": "number",
+        "description": "Drop results whose exact cosine similarity is below this value (vector mode only)"
+    },
+    "mmr_lambda": {
+        "type": "number",
+        "description": "Diversify results with maximal marginal relevance: 1 is pure relevance, lower values favour diversity (vector mode only)"
+    },
+    "dedup": {
+        "type": "boolean",
+        "description": "Collapse near-duplicate results into one representative with a duplicate_count (vector mode only)"
+    },
+    "dedup_threshold": {
+        "type": "number",
+        "description": "Cosine similarity at which two results count as duplicates (vector mode only; implies dedup, default 0.95)"
+    }
+}
+
+HNSW_SETTING_PROPERTIES = {
+    "space": {
+        "type": "string",
+        "enum": list(HNSW_SPACES),
+        "description": "Distance function"
+    },
+    "M": {
+        "type": "number",
+        "description": "Graph degree (higher: better recall, more memory)"
+    },
+    "construction_ef": {
+        "type": "number",
+        "description": "Candidate list size while building the index"
+    },
+    "search_ef": {
+        "type": "number",
+        "description": "Candidate list size while querying (higher: better recall, slower)"
+    }
+}
+
 @server.list_tools()
 async def handle_list_tools() -> list[types.Tool]:
     """List available tools for the memory dashboard."""
@@ -277,77 +3267,247 @@ async def handle_list_tools() -> list[types.Tool]:
                         "type": "string",
                         "description": "Search query"
                     },
+                    **SEARCH_FILTER_PROPERTIES,
+                    **RERANK_PROPERTIES,
+                    "n_results": {
+                        "type": "number",
+                        "description": "Number of results to return",
+                        "default": 5
+                    },
+                    **PROJECTION_PROPERTIES
+                },
+                "required": ["query"]
+            }
+        ),
+        types.Tool(
+            name="dashboard_search_by_tag",
+            description="Dashboard version: Retrieve memories by specific tags or a boolean tag query (pass limit to page through results)",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "tags": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Tags to search for (any of them matches)"
+                    },
+                    "tag_query": {
+                        "type": "string",
+                        "description": "Boolean tag expression with AND, OR, NOT and parentheses, e.g. 'project-x AND bug NOT resolved'; quote tags with spaces"
+                    },
+                    "limit": {
+                        "type": "number",
+                        "description": "Maximum number of memories per page; without limit or cursor all matches are returned"
+                    },
+                    "cursor": CURSOR_PROPERTY,
+                    **PROJECTION_PROPERTIES
+                }
+            }
+        ),
+        types.Tool(
+            name="dashboard_get_stats",
+            description="Dashboard version: Retrieve statistics about the memory database",
+            inputSchema={"type": "object", "properties": {}}
+        ),
+        types.Tool(
+            name="dashboard_get_detailed_stats",
+            description="Dashboard version: Retrieve tag frequencies, type distribution, memories per day and content length percentiles in one pass",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "top_k": {
+                        "type": "number",
+                        "description": "Number of most frequent tags to return",
+                        "default": 20
+                    }
+                }
+            }
+        ),
+        types.Tool(
+            name="dashboard_get_timeline",
+            description="Dashboard version: Retrieve memory counts per day, week or month from the timeline index",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "start_date": {
+                        "type": "string",
+                        "description": "First day to include (YYYY-MM-DD), defaults to the earliest memory"
+                    },
+                    "end_date": {
+                        "type": "string",
+                        "description": "Last day to include (YYYY-MM-DD), defaults to the latest memory"
+                    },
+                    "granularity": {
+                        "type": "string",
+                        "enum": ["day", "week", "month"],
+                        "description": "Bucket size",
+                        "default": "day"
+                    }
+                }
+            }
+        ),
+        types.Tool(
+            name="dashboard_get_cache_stats",
+            description="Dashboard version: Retrieve server cache hit, miss and eviction counters",
+            inputSchema={"type": "object", "properties": {}}
+        ),
+        types.Tool(
+            name="dashboard_get_tag_counts",
+            description="Dashboard version: Retrieve exact memory counts per tag from the tag index",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "rebuild": {
+                        "type": "boolean",
+                        "description": "Rebuild the tag index from scratch before reading it",
+                        "default": False
+                    }
+                }
+            }
+        ),
+        types.Tool(
+            name="dashboard_optimize_db",
+            description="Dashboard version: Optimize the database",
+            inputSchema={"type": "object", "properties": {}}
+        ),
+        types.Tool(
+            name="dashboard_migrate_collection",
+            description="Dashboard version: Rebuild the collection with new HNSW settings (copies all memories; create a backup first). The rebuilt collection gets a new ID, so stop other processes using this database (mcp-memory-service, the app's direct mode) and restart them afterwards",
+            inputSchema={
+                "type": "object",
+                "properties": HNSW_SETTING_PROPERTIES
+            }
+        ),
+        types.Tool(
+            name="dashboard_benchmark_hnsw",
+            description="Dashboard version: Measure recall@k against exact search and p50/p99 query latency for HNSW settings on stored embeddings",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "settings": {
+                        "type": "array",
+                        "description": "HNSW settings to compare; unspecified values default to the current collection's. Defaults to search_ef 10, 50 and 100",
+                        "items": {
+                            "type": "object",
+                            "properties": HNSW_SETTING_PROPERTIES
+                        }
+                    },
+                    "k": {
+                        "type": "number",
+                        "description": "Neighbours per query",
+                        "default": 10
+                    },
+                    "sample_size": {
+                        "type": "number",
+                        "description": "Number of stored embeddings used as queries",
+                        "default": 50
+                    },
+                    "max_vectors": {
+                        "type": "number",
+                        "description": "Maximum number of stored embeddings to index per setting",
+                        "default": 5000
+                    }
+                }
+            }
+        ),
+        types.Tool(
+            name="dashboard_create_backup",
+            description="Dashboard version: Create a backup of the database",
+            inputSchema={"type": "object", "properties": {}}
+        ),
+        types.Tool(
+            name="retrieve_memory",
+            description="Perform semantic search for relevant memories",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "query": {
+                        "type": "string",
+                        "description": "Search query"
+                    },
+                    **SEARCH_FILTER_PROPERTIES,
+                    **RERANK_PROPERTIES,
                     "n_results": {
                         "type": "number",
                         "description": "Number of results to return",
                         "default": 5
-                    }
+                    },
+                    **PROJECTION_PROPERTIES
                 },
                 "required": ["query"]
             }
         ),
         types.Tool(
-            name="dashboard_search_by_tag",
-            description="Dashboard version: Retrieve memories by specific tags",
+            name="retrieve_memory_batch",
+            description="Perform semantic search for many queries with one batched embedding and search call",
             inputSchema={
                 "type": "object",
                 "properties": {
-                    "tags": {
+                    "queries": {
                         "type": "array",
-                        "items": {"type": "string"},
-                        "description": "Tags to search for"
-                    }
+                        "description": "Queries to run, either plain strings or objects with their own n_results",
+                        "items": {
+                            "anyOf": [
+                                {"type": "string"},
+                                {
+                                    "type": "object",
+                                    "properties": {
+                                        "query": {"type": "string"},
+                                        "n_results": {"type": "number"}
+                                    },
+                                    "required": ["query"]
+                                }
+                            ]
+                        }
+                    },
+                    "n_results": {
+                        "type": "number",
+                        "description": "Default number of results per query",
+                        "default": 5
+                    },
+                    **SEARCH_FILTER_PROPERTIES,
+                    **PROJECTION_PROPERTIES
                 },
-                "required": ["tags"]
+                "required": ["queries"]
             }
         ),
         types.Tool(
-            name="dashboard_get_stats",
-            description="Dashboard version: Retrieve statistics about the memory database",
-            inputSchema={"type": "object", "properties": {}}
-        ),
-        types.Tool(
-            name="dashboard_optimize_db",
-            description="Dashboard version: Optimize the database",
-            inputSchema={"type": "object", "properties": {}}
-        ),
-        types.Tool(
-            name="dashboard_create_backup",
-            description="Dashboard version: Create a backup of the database",
-            inputSchema={"type": "object", "properties": {}}
-        ),
-        types.Tool(
-            name="retrieve_memory",
-            description="Perform semantic search for relevant memories",
+            name="get_memories",
+            description="Fetch full memories for a batch of IDs in one call",
             inputSchema={
                 "type": "object",
                 "properties": {
-                    "query": {
-                        "type": "string",
-                        "description": "Search query"
+                    "ids": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "Memory IDs to fetch"
                     },
-                    "n_results": {
-                        "type": "number",
-                        "description": "Number of results to return",
-                        "default": 5
-                    }
+                    "fields": FIELDS_PROPERTY
                 },
-                "required": ["query"]
+                "required": ["ids"]
             }
         ),
         types.Tool(
             name="search_by_tag",
-            description="Retrieve memories by specific tags",
+            description="Retrieve memories by specific tags (pass limit to page through results, then next_cursor back as cursor)",
             inputSchema={
                 "type": "object",
                 "properties": {
                     "tags": {
                         "type": "array",
                         "items": {"type": "string"},
-                        "description": "Tags to search for"
-                    }
-                },
-                "required": ["tags"]
+                        "description": "Tags to search for (any of them matches)"
+                    },
+                    "tag_query": {
+                        "type": "string",
+                        "description": "Boolean tag expression with AND, OR, NOT and parentheses, e.g. 'project-x AND bug NOT resolved'; quote tags with spaces"
+                    },
+                    "limit": {
+                        "type": "number",
+                        "description": "Maximum number of memories per page; without limit or cursor all matches are returned"
+                    },
+                    "cursor": CURSOR_PROPERTY,
+                    **PROJECTION_PROPERTIES
+                }
             }
         ),
         types.Tool(
@@ -416,7 +3576,13 @@ async def handle_list_tools() -> list[types.Tool]:
                         "type": "number",
                         "description": "Number of results to return",
                         "default": 5
-                    }
+                    },
+                    "limit": {
+                        "type": "number",
+                        "description": "Maximum number of memories per page"
+                    },
+                    "cursor": CURSOR_PROPERTY,
+                    **PROJECTION_PROPERTIES
                 },
                 "required": ["query"]
             }
@@ -435,7 +3601,13 @@ async def handle_list_tools() -> list[types.Tool]:
                         "type": "number",
                         "description": "Number of results to return",
                         "default": 5
-                    }
+                    },
+                    "limit": {
+                        "type": "number",
+                        "description": "Maximum number of memories per page"
+                    },
+                    "cursor": CURSOR_PROPERTY,
+                    **PROJECTION_PROPERTIES
                 },
                 "required": ["query"]
             }
@@ -457,15 +3629,76 @@ async def handle_list_tools() -> list[types.Tool]:
         )
     ]
 
+async def call_search_tool(
+    name: str,
+    arguments: dict
+) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+    """Semantic search tools, which await the micro-batching scheduler."""
+    if name == "retrieve_memory":
+        query_text = arguments.get("query")
+        if not query_text:
+            raise ValueError("Query text cannot be empty for retrieve_memory")
+        
+        try:
+            memories_list = await retrieve_memories(query_text, arguments)
+            
+            # Return a single TextContent with the JSON string of the memories list
+            return [types.TextContent(
+                type="text",
+                text=json.dumps({"memories": memories_list}) # Serialize the list as JSON
+            )]
+            
+        except Exception as e:
+            logger.error("Error retrieving memory from ChromaDB: %s", e)
+            raise ValueError(f"Failed to retrieve memories: {e}")
+
+    elif name == "dashboard_retrieve_memory":
+        query_text = arguments.get("query")
+        if not query_text:
+            raise ValueError("Query text cannot be empty for dashboard_retrieve_memory")
+        
+        try:
+            memories_list = await retrieve_memories(query_text, arguments)
+            
+            return [types.TextContent(
+                type="text",
+                text=json.dumps({"memories": memories_list})
+            )]
+            
+        except Exception as e:
+            logger.error("Error retrieving memory from ChromaDB: %s", e)
+            return [types.TextContent(
+                type="text",
+                text=json.dumps({"memories": [], "error": str(e)})
+            )]
+
+    else:
+        raise ValueError(f"Unknown search tool: {name}")
+
 @server.call_tool()
 async def handle_call_tool(
     name: str,
     arguments: dict | None
 ) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
     """Handle tool execution requests."""
+    global main_event_loop
     if not arguments:
         raise ValueError("Missing arguments")
+    main_event_loop = asyncio.get_running_loop()
+
+    if name in ("retrieve_memory", "dashboard_retrieve_memory"):
+        return await call_search_tool(name, arguments)
 
+    # Everything else does blocking ChromaDB or filesystem work, so it runs on the
+    # bounded executor instead of stalling the event loop
+    operation_class = TOOL_OPERATION_CLASSES.get(name, "read")
+    return await blocking_executor.run(operation_class, call_tool_sync, name, arguments)
+
+def call_tool_sync(
+    name: str,
+    arguments: dict
+) -> list[types.TextContent | types.ImageContent | types.EmbeddedResource]:
+    """Synchronous tool implementations, executed on the bounded executor."""
     if name == "store_memory":
         content = arguments.get("content")
         if not content:
@@ -477,6 +3710,11 @@ async def handle_call_tool(
         # Add a timestamp if not present.
         if 'timestamp' not in metadata_arg:
             metadata_arg['timestamp'] = datetime.utcnow().isoformat()
+        # Chroma only compares numbers with $gt/$gte/$lt/$lte, so time filters use this field
+        if 'timestamp_epoch' not in metadata_arg:
+            timestamp_epoch = timestamp_to_epoch(metadata_arg['timestamp'])
+            if timestamp_epoch is not None:
+                metadata_arg['timestamp_epoch'] = timestamp_epoch
 
         new_id = str(uuid.uuid4())
         
@@ -487,8 +3725,8 @@ async def handle_call_tool(
                 metadatas=[metadata_arg]
             )
             
-            # OPTIMIZATION: Invalidate stats cache when new memory is added
-            stats_cache.invalidate("stats")
+            # OPTIMIZATION: Keep indexes current and apply the write to cached stats
+            record_memory_stored(new_id, content, metadata_arg)
             
             return [types.TextContent(
                 type="text",
@@ -496,217 +3734,93 @@ async def handle_call_tool(
             )]
         except Exception as e:
             # Log the error server-side (optional, basic print for now)
-            print(f"Error storing memory to ChromaDB: {e}") 
+            logger.error("Error storing memory to ChromaDB: %s", e)
             # Re-raise to let the MCP framework handle it or return a structured error
             raise ValueError(f"Failed to store memory: {e}")
 
-    elif name == "retrieve_memory":
-        query_text = arguments.get("query")
-        if not query_text:
-            raise ValueError("Query text cannot be empty for retrieve_memory")
+    elif name == "retrieve_memory_batch":
+        queries_arg = arguments.get("queries")
+        if not isinstance(queries_arg, list) or not queries_arg:
+            raise ValueError("Queries cannot be empty for retrieve_memory_batch")
         
-        n_results_val = arguments.get("n_results", 5)
+        default_n_results = int(arguments.get("n_results", 5))
+        queries = []
+        for query_item in queries_arg:
+            if isinstance(query_item, dict):
+                query_text = query_item.get("query")
+                n_results_val = int(query_item.get("n_results", default_n_results))
+            else:
+                query_text = query_item
+                n_results_val = default_n_results
+            if not isinstance(query_text, str) or not query_text.strip():
+                raise ValueError("Each query in retrieve_memory_batch must be a non-empty string")
+            queries.append((query_text, n_results_val))
         
         try:
-            # Track query time
-            start_time = time.time()
-            
-            results = collection.query(
-                query_texts=[query_text],
-                n_results=int(n_results_val),
-                include=['metadatas', 'documents', 'distances'] # Ensure these are included
-            )
-            
-            # Record query time
-            end_time = time.time()
-            query_time_ms = (end_time - start_time) * 1000
-            query_times.append(query_time_ms)
-            
-            memories_list = []
-            # Results from query are structured with lists of lists for batch queries,
-            # but we send one query, so we access the first element (index 0) of these lists.
-            ids = results.get('ids', [[]])[0]
-            documents = results.get('documents', [[]])[0]
-            metadatas = results.get('metadatas', [[]])[0]
-            distances = results.get('distances', [[]])[0]
-
-            for i in range(len(ids)):
-                similarity = 1.0 - (distances[i] if distances[i] is not None else 1.0) # Handle potential None in distances
-                # Ensure metadata is a dict, default to empty if None
-                current_metadata = metadatas[i] if metadatas[i] is not None else {}
-                memories_list.append({
-                    "id": ids[i],
-                    "content": documents[i] if documents[i] is not None else "",
-                    "metadata": current_metadata,
-                    "similarity": similarity,
-                    # Ensure tags are present in metadata, defaulting to empty list
-                    "tags": current_metadata.get("tags", []) if isinstance(current_metadata.get("tags"), list) else []
-                })
-            
-            # Return a single TextContent with the JSON string of the memories list
+            where, tag_filter = build_search_filter(arguments)
+            results_per_query = run_semantic_search_batch(queries, where, parse_fields(arguments), tag_filter)
+            snippet_length = get_snippet_length(arguments)
+            results_per_query = [
+                apply_snippets(memories_list, query_text, snippet_length)
+                for (query_text, _), memories_list in zip(queries, results_per_query)
+            ]
             return [types.TextContent(
                 type="text",
-                text=json.dumps({"memories": memories_list}) # Serialize the list as JSON
+                text=json.dumps({
+                    "results": [
+                        {"query": query_text, "memories": memories_list}
+                        for (query_text, _), memories_list in zip(queries, results_per_query)
+                    ]
+                })
             )]
             
         except Exception as e:
-            print(f"Error retrieving memory from ChromaDB: {e}") # Or use proper logging
+            logger.error("Error retrieving memory batch from ChromaDB: %s", e)
             raise ValueError(f"Failed to retrieve memories: {e}")
 
-    elif name == "dashboard_retrieve_memory":
-        query_text = arguments.get("query")
-        if not query_text:
-            raise ValueError("Query text cannot be empty for dashboard_retrieve_memory")
-        
-        n_results_val = arguments.get("n_results", 5)
-        
+    elif name == "get_memories":
+        memory_ids = arguments.get("ids")
+        if not isinstance(memory_ids, list) or not memory_ids:
+            raise ValueError("IDs cannot be empty for get_memories")
+        memory_ids = list(dict.fromkeys(memory_id for memory_id in memory_ids if isinstance(memory_id, str) and memory_id))
+        if len(memory_ids) > SEARCH_MAX_PAGE_SIZE:
+            raise ValueError(f"get_memories accepts at most {SEARCH_MAX_PAGE_SIZE} IDs per call")
+
         try:
-            # Track query time
-            start_time = time.time()
-            
-            results = collection.query(
-                query_texts=[query_text],
-                n_results=int(n_results_val),
-                include=['metadatas', 'documents', 'distances']
-            )
-            
-            # Record query time
-            end_time = time.time()
-            query_time_ms = (end_time - start_time) * 1000
-            query_times.append(query_time_ms)
-            
-            memories_list = []
-            ids = results.get('ids', [[]])[0]
-            documents = results.get('documents', [[]])[0]
-            metadatas = results.get('metadatas', [[]])[0]
-            distances = results.get('distances', [[]])[0]
-
-            for i in range(len(ids)):
-                similarity = 1.0 - (distances[i] if distances[i] is not None else 1.0)
-                current_metadata = metadatas[i] if metadatas[i] is not None else {}
-                memories_list.append({
-                    "id": ids[i],
-                    "content": documents[i] if documents[i] is not None else "",
-                    "metadata": current_metadata,
-                    "similarity": similarity,
-                    "tags": current_metadata.get("tags", []) if isinstance(current_metadata.get("tags"), list) else []
-                })
-            
             return [types.TextContent(
                 type="text",
-                text=json.dumps({"memories": memories_list})
+                text=json.dumps(get_memories_by_id(memory_ids, parse_fields(arguments)))
             )]
-            
+
         except Exception as e:
-            print(f"Error retrieving memory from ChromaDB: {e}")
-            return [types.TextContent(
-                type="text",
-                text=json.dumps({"memories": [], "error": str(e)})
-            )]
+            logger.error("Error fetching memories by ID from ChromaDB: %s", e)
+            raise ValueError(f"Failed to fetch memories: {e}")
 
     elif name == "search_by_tag":
-        tags_list = arguments.get("tags")
-
-        if not isinstance(tags_list, list) or not tags_list:
-            return [types.TextContent(
-                type="text",
-                text=json.dumps({"memories": []})
-            )]
-
-        or_conditions = []
-        for tag in tags_list:
-            if isinstance(tag, str) and tag.strip():
-                or_conditions.append({"tags": {"$contains": tag.strip()}})
-        
-        if not or_conditions:
-            return [types.TextContent(
-                type="text",
-                text=json.dumps({"memories": []})
-            )]
-
-        where_filter = {"$or": or_conditions}
-        
         try:
-            results = collection.get(
-                where=where_filter,
-                include=['metadatas', 'documents']
-            )
-            
-            memories_list = []
-            ids = results.get('ids', [])
-            documents = results.get('documents', [])
-            metadatas = results.get('metadatas', [])
-
-            for i in range(len(ids)):
-                current_metadata = metadatas[i] if metadatas[i] is not None else {}
-                memories_list.append({
-                    "id": ids[i],
-                    "content": documents[i] if documents[i] is not None else "",
-                    "metadata": current_metadata,
-                    "tags": current_metadata.get("tags", []) if isinstance(current_metadata.get("tags"), list) else []
-                })
-            
+            page = search_by_tag_page(name, arguments)
             return [types.TextContent(
                 type="text",
-                text=json.dumps({"memories": memories_list})
+                text=json.dumps(page)
             )]
-            
+
         except Exception as e:
-            print(f"Error searching by tag in ChromaDB: {e}")
+            logger.error("Error searching by tag in ChromaDB: %s", e)
             raise ValueError(f"Failed to search by tag: {e}")
 
     elif name == "dashboard_search_by_tag":
-        tags_list = arguments.get("tags")
-
-        if not isinstance(tags_list, list) or not tags_list:
-            return [types.TextContent(
-                type="text",
-                text=json.dumps({"memories": []})
-            )]
-
-        or_conditions = []
-        for tag in tags_list:
-            if isinstance(tag, str) and tag.strip():
-                or_conditions.append({"tags": {"$contains": tag.strip()}})
-        
-        if not or_conditions:
-            return [types.TextContent(
-                type="text",
-                text=json.dumps({"memories": []})
-            )]
-
-        where_filter = {"$or": or_conditions}
-        
         try:
-            results = collection.get(
-                where=where_filter,
-                include=['metadatas', 'documents']
-            )
-            
-            memories_list = []
-            ids = results.get('ids', [])
-            documents = results.get('documents', [])
-            metadatas = results.get('metadatas', [])
-
-            for i in range(len(ids)):
-                current_metadata = metadatas[i] if metadatas[i] is not None else {}
-                memories_list.append({
-                    "id": ids[i],
-                    "content": documents[i] if documents[i] is not None else "",
-                    "metadata": current_metadata,
-                    "tags": current_metadata.get("tags", []) if isinstance(current_metadata.get("tags"), list) else []
-                })
-            
+            page = search_by_tag_page(name, arguments)
             return [types.TextContent(
                 type="text",
-                text=json.dumps({"memories": memories_list})
+                text=json.dumps(page)
             )]
-            
+
         except Exception as e:
-            print(f"Error searching by tag in ChromaDB: {e}")
+            logger.error("Error searching by tag in ChromaDB: %s", e)
             return [types.TextContent(
                 type="text",
-                text=json.dumps({"memories": [], "error": str(e)})
+                text=json.dumps({"memories": [], "next_cursor": None, "error": str(e)})
             )]
 
     elif name == "delete_by_tag":
@@ -716,15 +3830,24 @@ async def handle_call_tool(
             raise ValueError("Tag cannot be empty for delete_by_tag")
 
         tag_to_delete = tag_to_delete.strip()
-        where_filter = {"tags": {"$contains": tag_to_delete}}
         
         try:
-            # First, find the IDs of the documents to be deleted.
-            results = collection.get(
-                where=where_filter,
-                include=[] # We only need IDs
-            )
-            ids_to_delete = results.get('ids', [])
+            # First, find the IDs of the documents to be deleted through the tag postings index.
+            # Metadatas are needed to keep the tag index in sync.
+            with tag_postings.lock:
+                tag_postings.ensure_fresh(collection)
+                candidate_ids = tag_postings.resolve(tag_postings.match_any([tag_to_delete]))
+            results = collection.get(ids=candidate_ids, include=['metadatas']) if candidate_ids else {}
+            ids_to_delete = []
+            deleted_metadatas = []
+            # Only delete memories that still carry the tag
+            for memory_id, metadata in zip(results.get('ids') or [], results.get('metadatas') or []):
+                if tag_to_delete in get_memory_tags(metadata):
+                    ids_to_delete.append(memory_id)
+                    deleted_metadatas.append(metadata)
+            if len(ids_to_delete) < len(candidate_ids):
+                logger.warning("%s out of date: %s IDs no longer carry tag '%s'", tag_postings.label, len(candidate_ids) - len(ids_to_delete), tag_to_delete)
+                tag_postings.invalidate()
 
             if not ids_to_delete:
                 return [types.TextContent(
@@ -734,8 +3857,8 @@ async def handle_call_tool(
 
             collection.delete(ids=ids_to_delete) # Delete by specific IDs
             
-            # OPTIMIZATION: Invalidate stats cache when memories are deleted
-            stats_cache.invalidate("stats")
+            # OPTIMIZATION: Keep indexes current and apply the delete to cached stats
+            record_memories_deleted(ids_to_delete, deleted_metadatas)
             
             return [types.TextContent(
                 type="text",
@@ -743,24 +3866,25 @@ async def handle_call_tool(
             )]
             
         except Exception as e:
-            print(f"Error deleting memories by tag '{tag_to_delete}' from ChromaDB: {e}")
+            logger.error("Error deleting memories by tag '%s' from ChromaDB: %s", tag_to_delete, e)
             raise ValueError(f"Failed to delete memories by tag '{tag_to_delete}': {e}")
 
     elif name == "check_database_health":
         try:
-            heartbeat_ns = client.heartbeat() 
+            heartbeat_ns = get_heartbeat()
             health_status = {
                 "status": "healthy" if heartbeat_ns > 0 else "unhealthy",
                 "heartbeat_ns": heartbeat_ns,
                 "health": 100 if heartbeat_ns > 0 else 0, 
-                "avg_query_time": get_average_query_time()  # Use actual average
+                "avg_query_time": get_average_query_time(),  # Use actual average
+                "executor": blocking_executor.metrics()
             }
             return [types.TextContent(
                 type="text",
                 text=json.dumps(health_status)
             )]
         except Exception as e:
-            print(f"Error during ChromaDB health check: {e}")
+            logger.error("Error during ChromaDB health check: %s", e)
             health_status = {
                 "status": "unhealthy",
                 "error": str(e),
@@ -774,19 +3898,20 @@ async def handle_call_tool(
     
     elif name == "dashboard_check_health":
         try:
-            heartbeat_ns = client.heartbeat() 
+            heartbeat_ns = get_heartbeat()
             health_status = {
                 "status": "healthy" if heartbeat_ns > 0 else "unhealthy",
                 "heartbeat_ns": heartbeat_ns,
                 "health": 100 if heartbeat_ns > 0 else 0, 
-                "avg_query_time": get_average_query_time()  # Use actual average
+                "avg_query_time": get_average_query_time(),  # Use actual average
+                "executor": blocking_executor.metrics()
             }
             return [types.TextContent(
                 type="text",
                 text=json.dumps(health_status)
             )]
         except Exception as e:
-            print(f"Error during dashboard health check: {e}")
+            logger.error("Error during dashboard health check: %s", e)
             health_status = {
                 "status": "unhealthy",
                 "error": str(e),
@@ -806,7 +3931,7 @@ async def handle_call_tool(
                 text=json.dumps(stats_data)
             )]
         except Exception as e:
-            print(f"Error getting stats from ChromaDB: {e}")
+            logger.error("Error getting stats from ChromaDB: %s", e)
             error_stats = {
                 "total_memories": 0,
                 "unique_tags": 0,
@@ -825,7 +3950,7 @@ async def handle_call_tool(
                 text=json.dumps(stats_data)
             )]
         except Exception as e:
-            print(f"Error getting stats from ChromaDB: {e}")
+            logger.error("Error getting stats from ChromaDB: %s", e)
             error_stats = {
                 "total_memories": 0,
                 "unique_tags": 0,
@@ -836,6 +3961,79 @@ async def handle_call_tool(
                 text=json.dumps(error_stats)
             )]
 
+    elif name == "dashboard_get_detailed_stats":
+        try:
+            top_k = int(arguments.get("top_k", 20))
+            detailed_stats = get_detailed_stats(top_k)
+            return [types.TextContent(
+                type="text",
+                text=json.dumps(detailed_stats)
+            )]
+        except Exception as e:
+            logger.error("Error getting detailed stats: %s", e)
+            return [types.TextContent(
+                type="text",
+                text=json.dumps({"total_memories": 0, "error": str(e)})
+            )]
+
+    elif name == "dashboard_get_timeline":
+        granularity = arguments.get("granularity", "day")
+        try:
+            timeline_index.ensure_fresh(collection)
+            buckets = timeline_index.range_counts(
+                arguments.get("start_date"),
+                arguments.get("end_date"),
+                granularity
+            )
+            return [types.TextContent(
+                type="text",
+                text=json.dumps({
+                    "granularity": granularity,
+                    "buckets": buckets,
+                    "total": sum(bucket["count"] for bucket in buckets)
+                })
+            )]
+        except Exception as e:
+            logger.error("Error getting timeline: %s", e)
+            return [types.TextContent(
+                type="text",
+                text=json.dumps({"granularity": granularity, "buckets": [], "total": 0, "error": str(e)})
+            )]
+
+    elif name == "dashboard_get_cache_stats":
+        cache_metrics = server_cache.metrics()
+        cache_metrics["embeddings"] = embedding_cache.metrics() if embedding_cache is not None else None
+        cache_metrics["query_batcher"] = query_batcher.metrics()
+        cache_metrics["lexical_index"] = lexical_index.describe()
+        cache_metrics["tag_postings"] = tag_postings.describe()
+        return [types.TextContent(
+            type="text",
+            text=json.dumps(cache_metrics)
+        )]
+
+    elif name == "dashboard_get_tag_counts":
+        try:
+            if arguments.get("rebuild"):
+                tag_index.rebuild(collection)
+                server_cache.invalidate("stats")
+            else:
+                tag_index.ensure_fresh(collection)
+            tag_counts = tag_index.get_counts()
+            return [types.TextContent(
+                type="text",
+                text=json.dumps({
+                    "tags": dict(sorted(tag_counts.items(), key=lambda item: (-item[1], item[0]))),
+                    "unique_tags": len(tag_counts),
+                    "total_memories": tag_index.total_memories
+                })
+            )]
+        except Exception as e:
+            logger.error("Error getting tag counts: %s", e)
+            return [types.TextContent(
+                type="text",
+                text=json.dumps({"tags": {}, "unique_tags": 0, "error": str(e)})
+            )]
+
     elif name == "optimize_db":
         return [types.TextContent(
             type="text",
@@ -854,6 +4052,43 @@ async def handle_call_tool(
             })
         )]
 
+    elif name == "dashboard_migrate_collection":
+        try:
+            settings = {key: arguments.get(key) for key in ("space", "M", "construction_ef", "search_ef")}
+            if not parse_hnsw_settings(settings):
+                raise ValueError("No HNSW settings given")
+            result = migrate_collection(settings)
+            return [types.TextContent(
+                type="text",
+                text=json.dumps({"status": "success", **result})
+            )]
+        except Exception as e:
+            logger.error("Error migrating collection: %s", e)
+            return [types.TextContent(
+                type="text",
+                text=json.dumps({"status": "error", "message": str(e)})
+            )]
+
+    elif name == "dashboard_benchmark_hnsw":
+        try:
+            settings_list = arguments.get("settings") or [{"search_ef": search_ef} for search_ef in (10, 50, 100)]
+            result = benchmark_hnsw(
+                settings_list,
+                k=int(arguments.get("k", 10)),
+                sample_size=int(arguments.get("sample_size", 50)),
+                max_vectors=int(arguments.get("max_vectors", 5000))
+            )
+            return [types.TextContent(
+                type="text",
+                text=json.dumps(result)
+            )]
+        except Exception as e:
+            logger.error("Error benchmarking HNSW settings: %s", e)
+            return [types.TextContent(
+                type="text",
+                text=json.dumps({"error": str(e)})
+            )]
+
     elif name == "create_backup":
         try:
             # Create timestamped backup filename
@@ -887,7 +4122,7 @@ async def handle_call_tool(
             )]
             
         except Exception as e:
-            print(f"Error creating backup: {e}")
+            logger.error("Error creating backup: %s", e)
             error_info = {
                 "status": "error",
                 "message": f"Failed to create backup: {str(e)}",
@@ -931,7 +4166,7 @@ async def handle_call_tool(
             )]
             
         except Exception as e:
-            print(f"Error creating backup: {e}")
+            logger.error("Error creating backup: %s", e)
             error_info = {
                 "status": "error",
                 "message": f"Failed to create backup: {str(e)}",
@@ -949,7 +4184,7 @@ async def handle_call_tool(
         
         try:
             # Check if memory exists first
-            existing = collection.get(ids=[memory_id])
+            existing = collection.get(ids=[memory_id], include=['metadatas'])
             if not existing['ids']:
                 return [types.TextContent(
                     type="text",
@@ -962,8 +4197,8 @@ async def handle_call_tool(
             # Delete the memory
             collection.delete(ids=[memory_id])
             
-            # OPTIMIZATION: Invalidate stats cache when memory is deleted
-            stats_cache.invalidate("stats")
+            # OPTIMIZATION: Keep indexes current and apply the delete to cached stats
+            record_memories_deleted([memory_id], existing.get('metadatas') or [{}])
             
             return [types.TextContent(
                 type="text",
@@ -974,7 +4209,7 @@ async def handle_call_tool(
             )]
             
         except Exception as e:
-            print(f"Error deleting memory '{memory_id}': {e}")
+            logger.error("Error deleting memory '%s': %s", memory_id, e)
             return [types.TextContent(
                 type="text",
                 text=json.dumps({
@@ -988,74 +4223,19 @@ async def handle_call_tool(
         if not query_text:
             raise ValueError("Query text cannot be empty for recall_memory")
         
-        n_results_val = arguments.get("n_results", 5)
-        
         try:
-            # Parse time expressions from query
-            cleaned_query, time_filter = parse_time_expression(query_text)
-            
             # Track query time
             start_time = time.time()
-            
-            if time_filter:
-                # If we have a time filter, use get() with where clause
-                # Note: ChromaDB metadata filtering is limited, this is a basic implementation
-                results = collection.get(
-                    where=time_filter,
-                    include=['metadatas', 'documents']
-                )
-                
-                # Convert get results to query-like format
-                memories_list = []
-                ids = results.get('ids', [])
-                documents = results.get('documents', [])
-                metadatas = results.get('metadatas', [])
-                
-                for i in range(min(len(ids), n_results_val)):
-                    current_metadata = metadatas[i] if metadatas[i] is not None else {}
-                    memories_list.append({
-                        "id": ids[i],
-                        "content": documents[i] if documents[i] is not None else "",
-                        "metadata": current_metadata,
-                        "tags": current_metadata.get("tags", []) if isinstance(current_metadata.get("tags"), list) else []
-                    })
-            else:
-                # If no time filter, perform regular semantic search
-                results = collection.query(
-                    query_texts=[cleaned_query if cleaned_query else query_text],
-                    n_results=int(n_results_val),
-                    include=['metadatas', 'documents', 'distances']
-                )
-                
-                memories_list = []
-                ids = results.get('ids', [[]])[0]
-                documents = results.get('documents', [[]])[0]
-                metadatas = results.get('metadatas', [[]])[0]
-                distances = results.get('distances', [[]])[0]
-
-                for i in range(len(ids)):
-                    similarity = 1.0 - (distances[i] if distances[i] is not None else 1.0)
-                    current_metadata = metadatas[i] if metadatas[i] is not None else {}
-                    memories_list.append({
-                        "id": ids[i],
-                        "content": documents[i] if documents[i] is not None else "",
-                        "metadata": current_metadata,
-                        "similarity": similarity,
-                        "tags": current_metadata.get("tags", []) if isinstance(current_metadata.get("tags"), list) else []
-                    })
-            
-            # Record query time
-            end_time = time.time()
-            query_time_ms = (end_time - start_time) * 1000
-            query_times.append(query_time_ms)
+            page = recall_page(name, arguments)
+            query_times.append((time.time() - start_time) * 1000)
             
             return [types.TextContent(
                 type="text",
-                text=json.dumps({"memories": memories_list})
+                text=json.dumps(page)
             )]
             
         except Exception as e:
-            print(f"Error during recall: {e}")
+            logger.error("Error during recall: %s", e)
             raise ValueError(f"Failed to recall memories: {e}")
 
     elif name == "dashboard_recall_memory":
@@ -1063,76 +4243,22 @@ async def handle_call_tool(
         if not query_text:
             raise ValueError("Query text cannot be empty for dashboard_recall_memory")
         
-        n_results_val = arguments.get("n_results", 5)
-        
         try:
-            # Parse time expressions from query
-            cleaned_query, time_filter = parse_time_expression(query_text)
-            
             # Track query time
             start_time = time.time()
-            
-            if time_filter:
-                # If we have a time filter, use get() with where clause
-                results = collection.get(
-                    where=time_filter,
-                    include=['metadatas', 'documents']
-                )
-                
-                # Convert get results to query-like format
-                memories_list = []
-                ids = results.get('ids', [])
-                documents = results.get('documents', [])
-                metadatas = results.get('metadatas', [])
-                
-                for i in range(min(len(ids), n_results_val)):
-                    current_metadata = metadatas[i] if metadatas[i] is not None else {}
-                    memories_list.append({
-                        "id": ids[i],
-                        "content": documents[i] if documents[i] is not None else "",
-                        "metadata": current_metadata,
-                        "tags": current_metadata.get("tags", []) if isinstance(current_metadata.get("tags"), list) else []
-                    })
-            else:
-                # If no time filter, perform regular semantic search
-                results = collection.query(
-                    query_texts=[cleaned_query if cleaned_query else query_text],
-                    n_results=int(n_results_val),
-                    include=['metadatas', 'documents', 'distances']
-                )
-                
-                memories_list = []
-                ids = results.get('ids', [[]])[0]
-                documents = results.get('documents', [[]])[0]
-                metadatas = results.get('metadatas', [[]])[0]
-                distances = results.get('distances', [[]])[0]
-
-                for i in range(len(ids)):
-                    similarity = 1.0 - (distances[i] if distances[i] is not None else 1.0)
-                    current_metadata = metadatas[i] if metadatas[i] is not None else {}
-                    memories_list.append({
-                        "id": ids[i],
-                        "content": documents[i] if documents[i] is not None else "",
-                        "metadata": current_metadata,
-                        "similarity": similarity,
-                        "tags": current_metadata.get("tags", []) if isinstance(current_metadata.get("tags"), list) else []
-                    })
-            
-            # Record query time
-            end_time = time.time()
-            query_time_ms = (end_time - start_time) * 1000
-            query_times.append(query_time_ms)
+            page = recall_page(name, arguments)
+            query_times.append((time.time() - start_time) * 1000)
             
             return [types.TextContent(
                 type="text",
-                text=json.dumps({"memories": memories_list})
+                text=json.dumps(page)
             )]
             
         except Exception as e:
-            print(f"Error during dashboard recall: {e}")
+            logger.error("Error during dashboard recall: %s", e)
             return [types.TextContent(
                 type="text",
-                text=json.dumps({"memories": [], "error": str(e)})
+                text=json.dumps({"memories": [], "next_cursor": None, "error": str(e)})
             )]
 
     elif name == "check_embedding_model":
@@ -1150,19 +4276,37 @@ async def handle_call_tool(
 
 async def main():
     """Run the server using stdin/stdout streams."""
-    async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
-        await server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="memory-dashboard",
-                server_version="0.1.0",
-                capabilities=server.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities={},
+    global main_event_loop
+    main_event_loop = asyncio.get_running_loop()
+
+    # Keep stats warm in the background so dashboard requests never wait on a scan
+    refresher_task = None
+    if STATS_REFRESH_INTERVAL > 0:
+        refresher_task = asyncio.create_task(stats_refresher(STATS_REFRESH_INTERVAL))
+
+    # Make memories written without timestamp_epoch visible to time filters
+    schedule_timestamp_backfill()
+
+    try:
+        async with mcp.server.stdio.stdio_server() as (read_stream, write_stream):
+            await server.run(
+                read_stream,
+                write_stream,
+                InitializationOptions(
+                    server_name="memory-dashboard",
+                    server_version="0.1.0",
+                    capabilities=server.get_capabilities(
+                        notification_options=NotificationOptions(),
+                        experimental_capabilities={},
+                    ),
                 ),
-            ),
-        )
+            )
+    finally:
+        if refresher_task is not None:
+            refresher_task.cancel()
+        blocking_executor.pool.shutdown(wait=False)
+        tag_index.flush()
+        timeline_index.flush()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
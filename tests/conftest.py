@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# server.py opens its Chroma collection at import time; point it at a throwaway directory
+os.environ.setdefault("MCP_MEMORY_CHROMA_PATH", os.path.join(tempfile.mkdtemp(prefix="memory-dashboard-tests-"), "chroma_db"))
+os.environ.setdefault("ANONYMIZED_TELEMETRY", "False")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "memory_dashboard"))
+
+
+@pytest.fixture
+def empty_collection():
+    """The server's temporary collection with every memory removed and the in-memory indexes reset"""
+    import server
+    existing = server.collection.get(include=[])["ids"]
+    if existing:
+        server.collection.delete(ids=existing)
+    server.bump_collection_version()
+    server.server_cache.invalidate()
+    server.lexical_index.loaded = False
+    server.tag_postings.invalidate()
+    # The count indexes judge freshness by row count alone, so start them from the empty collection
+    server.tag_index.rebuild(server.collection)
+    server.timeline_index.rebuild(server.collection)
+    return server.collection
+
+
+@pytest.fixture
+def add_memories(empty_collection):
+    """Add (id, content, metadata, embedding) tuples with explicit embeddings, so the embedding model is never loaded"""
+    def add(memories):
+        empty_collection.add(
+            ids=[memory_id for memory_id, _, _, _ in memories],
+            documents=[content for _, content, _, _ in memories],
+            metadatas=[metadata for _, _, metadata, _ in memories],
+            embeddings=[[float(value) for value in embedding] for _, _, _, embedding in memories]
+        )
+    return add
@@ -0,0 +1,101 @@
+"""Behavior tests for the journaled count indexes against a temporary Chroma collection"""
+import json
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def tag_index(tmp_path, empty_collection, add_memories):
+    add_memories([
+        ("m1", "first", {"tags": '["a", "b"]'}, [1, 0, 0, 0]),
+        ("m2", "second", {"tags": '["b"]'}, [0, 1, 0, 0]),
+    ])
+    index = server.TagIndex(str(tmp_path / "tag_index.json"))
+    index.ensure_fresh(empty_collection)
+    return index
+
+
+def reload(index):
+    restored = server.TagIndex(index.path)
+    assert restored.load()
+    return restored
+
+
+def test_rebuild_counts_every_memory(tag_index):
+    assert tag_index.get_counts() == {"a": 1, "b": 2}
+    assert tag_index.snapshot() == (2, 2)
+
+
+def test_writes_are_journaled_and_replayed_on_load(tag_index):
+    assert tag_index.add_memory({"tags": ["b", "c"]}) == 1
+    assert tag_index.remove_memories([{"tags": '["a", "b"]'}]) == 1
+    with open(tag_index.journal_path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 2
+
+    restored = reload(tag_index)
+    assert restored.get_counts() == {"b": 2, "c": 1}
+    assert restored.total_memories == 2
+    assert restored.journal_entries == 2
+
+
+def test_torn_journal_line_is_ignored(tag_index):
+    tag_index.add_memory({"tags": ["c"]})
+    with open(tag_index.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"g": %d, "op": "add", "ke' % tag_index.generation)
+
+    assert reload(tag_index).get_counts() == {"a": 1, "b": 2, "c": 1}
+
+
+def test_compaction_skips_lines_of_the_previous_generation(tag_index, monkeypatch):
+    monkeypatch.setattr(server, "INDEX_COMPACT_EVERY", 2)
+    old_generation = tag_index.generation
+    tag_index.add_memory({"tags": ["c"]})
+    tag_index.add_memory({"tags": ["d"]})  # folds both writes into a new snapshot
+    assert tag_index.generation == old_generation + 1
+    assert tag_index.journal_entries == 0
+
+    # A crash between the snapshot rename and the journal truncation leaves old lines behind
+    with open(tag_index.journal_path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"g": old_generation, "op": "add", "keys": ["c"], "memories": 1}) + "\n")
+
+    restored = reload(tag_index)
+    assert restored.get_counts() == {"a": 1, "b": 2, "c": 1, "d": 1}
+    assert restored.total_memories == 4
+
+
+def test_count_mismatch_triggers_rebuild(tag_index, empty_collection, add_memories):
+    add_memories([("m3", "third", {"tags": '["e"]'}, [0, 0, 1, 0])])
+    tag_index.ensure_fresh(empty_collection)
+    assert tag_index.get_counts() == {"a": 1, "b": 2, "e": 1}
+    assert tag_index.journal_entries == 0
+
+
+def test_count_index_requires_keys_for_memory(tmp_path):
+    with pytest.raises(TypeError):
+        server.CountIndex(str(tmp_path / "index.json"))
+
+
+def test_timeline_index_counts_per_day(tmp_path, empty_collection, add_memories):
+    add_memories([
+        ("m1", "first", {"timestamp": "2025-06-01T10:00:00"}, [1, 0, 0, 0]),
+        ("m2", "second", {"timestamp": "2025-06-03T10:00:00"}, [0, 1, 0, 0]),
+        ("m3", "third", {"timestamp": 1748944800.0}, [0, 0, 1, 0]),
+    ])
+    index = server.TimelineIndex(str(tmp_path / "timeline_index.json"))
+    index.ensure_fresh(empty_collection)
+    assert index.range_counts() == [
+        {"period": "2025-06-01", "count": 1},
+        {"period": "2025-06-02", "count": 0},
+        {"period": "2025-06-03", "count": 2},
+    ]
+
+
+def test_memory_day_buckets_offset_timestamps_by_utc():
+    assert server.get_memory_day({"timestamp": "2024-03-01T23:30:00-05:00"}) == "2024-03-02"
+    assert server.get_memory_day({"timestamp": "2024-03-01T23:30:00Z"}) == "2024-03-01"
+    assert server.get_memory_day({"timestamp": "2024-03-01"}) == "2024-03-01"
+    assert server.get_memory_day({"timestamp": 1709335800.0}) == "2024-03-01"
+    assert server.get_memory_day({"timestamp": "not a date"}) is None
+    assert server.get_memory_day({}) is None
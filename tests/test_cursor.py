@@ -0,0 +1,65 @@
+"""Tests for cursor pagination"""
+import base64
+import json
+
+import pytest
+
+import server
+
+
+def test_cursor_round_trip():
+    query_key = server.cursor_query_key("search_by_tag", {"tags": ["a"], "limit": 10})
+    cursor = server.encode_cursor(30, query_key)
+    assert "=" not in cursor
+    assert server.decode_cursor(cursor, query_key) == 30
+    assert server.decode_cursor(None, query_key) == 0
+
+
+def test_cursor_rejects_other_searches_and_garbage():
+    query_key = server.cursor_query_key("search_by_tag", {"tags": ["a"], "limit": 10})
+    other_key = server.cursor_query_key("search_by_tag", {"tags": ["b"], "limit": 10})
+    cursor = server.encode_cursor(10, query_key)
+    with pytest.raises(ValueError, match="does not belong"):
+        server.decode_cursor(cursor, other_key)
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        server.decode_cursor("not-a-cursor", query_key)
+
+
+def test_cursor_expires_when_collection_changes():
+    query_key = server.cursor_query_key("recall_memory", {"query": "x", "limit": 5})
+    cursor = server.encode_cursor(5, query_key)
+    server.bump_collection_version()
+    with pytest.raises(ValueError, match="expired"):
+        server.decode_cursor(cursor, query_key)
+
+
+def test_cursor_expires_when_another_process_writes(empty_collection, add_memories):
+    query_key = server.cursor_query_key("search_by_tag", {"tags": ["a"], "limit": 10})
+    cursor = server.encode_cursor(10, query_key)
+    # Electron direct mode or mcp-memory-service adds a memory; this process's version is unchanged
+    add_memories([("ext", "external", {"type": "note"}, [1, 0, 0, 0])])
+    server.server_cache.expire("collection", "count")
+    with pytest.raises(ValueError, match="expired"):
+        server.decode_cursor(cursor, query_key)
+
+
+def test_cursor_from_another_server_instance_is_rejected():
+    query_key = server.cursor_query_key("recall_memory", {"query": "x", "limit": 5})
+    payload = {"s": "other", "v": list(server.get_search_cache_version()), "q": query_key, "o": 5}
+    cursor = base64.urlsafe_b64encode(json.dumps(payload).encode("utf-8")).decode("ascii")
+    with pytest.raises(ValueError, match="expired"):
+        server.decode_cursor(cursor, query_key)
+
+
+def test_tag_search_pages_through_every_match_once(empty_collection, add_memories):
+    add_memories([(f"m{i}", f"note {i}", {"tags": '["paged"]'}, [i, 1, 0, 0]) for i in range(5)])
+    seen = []
+    arguments = {"tags": ["paged"], "limit": 2}
+    while True:
+        page = server.search_by_tag_page("search_by_tag", arguments)
+        seen.extend(memory["id"] for memory in page["memories"])
+        if page["next_cursor"] is None:
+            break
+        arguments = {"tags": ["paged"], "limit": 2, "cursor": page["next_cursor"]}
+    assert sorted(seen) == [f"m{i}" for i in range(5)]
+    assert len(seen) == 5
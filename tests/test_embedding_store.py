@@ -0,0 +1,88 @@
+"""Behavior tests for query embedding memoization and its on-disk store"""
+import hashlib
+import os
+
+import numpy as np
+
+import server
+
+
+def open_store(path, model_name="TestModel", max_rows=100):
+    return server.EmbeddingStore(str(path), model_name, max_rows)
+
+
+def test_put_writes_one_fixed_size_record_per_query(tmp_path):
+    store = open_store(tmp_path)
+    store.put("first query", [1.0, 2.0, 3.0])
+    store.put("second query", [4.0, 5.0, 6.0])
+    store.put("first query", [9.0, 9.0, 9.0])  # already stored, ignored
+
+    records = np.fromfile(tmp_path / "records.bin", dtype=store.record_dtype)
+    assert len(records) == 2
+    assert records[0]["hash"] == hashlib.sha1(b"first query").hexdigest().encode("ascii")
+    assert records[1]["vector"].tolist() == [4.0, 5.0, 6.0]
+
+
+def test_vectors_survive_reopening(tmp_path):
+    open_store(tmp_path).put("query", [0.5, 0.25])
+    reopened = open_store(tmp_path)
+    assert reopened.get("query").tolist() == [0.5, 0.25]
+    assert reopened.get("unknown") is None
+
+
+def test_records_appended_by_another_process_are_found(tmp_path):
+    reader = open_store(tmp_path)
+    writer = open_store(tmp_path)
+    writer.put("shared", [1.0, 1.0])
+    assert reader.get("shared").tolist() == [1.0, 1.0]
+    # The reader's own append lands after the writer's record instead of on top of it
+    reader.put("mine", [2.0, 2.0])
+    assert writer.get("mine").tolist() == [2.0, 2.0]
+    assert writer.get("shared").tolist() == [1.0, 1.0]
+
+
+def test_torn_tail_record_is_overwritten(tmp_path):
+    store = open_store(tmp_path)
+    store.put("complete", [1.0, 2.0])
+    with open(tmp_path / "records.bin", "ab") as f:
+        f.write(b"\x00" * 7)  # crash halfway through an append
+
+    reopened = open_store(tmp_path)
+    reopened.put("next", [3.0, 4.0])
+    assert os.path.getsize(tmp_path / "records.bin") == 2 * reopened.record_dtype.itemsize
+    assert open_store(tmp_path).get("next").tolist() == [3.0, 4.0]
+
+
+def test_other_model_or_old_layout_resets_the_store(tmp_path):
+    open_store(tmp_path).put("query", [1.0, 2.0])
+    (tmp_path / "vectors.f32").write_bytes(b"old layout")
+    store = open_store(tmp_path, model_name="OtherModel")
+    assert store.get("query") is None
+    assert not (tmp_path / "vectors.f32").exists()
+
+
+def test_max_rows_caps_the_store(tmp_path):
+    store = open_store(tmp_path, max_rows=1)
+    store.put("a", [1.0])
+    store.put("b", [2.0])
+    assert store.get("b") is None
+
+
+def test_cache_counts_memory_disk_and_model_lookups(tmp_path):
+    calls = []
+
+    def embed(texts):
+        calls.append(list(texts))
+        return [[float(len(text)), 1.0] for text in texts]
+
+    open_store(tmp_path).put("on disk", [7.0, 7.0])
+    cache = server.EmbeddingCache(embed, max_entries=2, store=open_store(tmp_path))
+    vectors = cache.get_many(["on disk", "new", "newer", "new"])
+    assert [vector.tolist() for vector in vectors] == [[7.0, 7.0], [3.0, 1.0], [5.0, 1.0], [3.0, 1.0]]
+    assert calls == [["new", "newer"]]
+    assert cache.get("newer").tolist() == [5.0, 1.0]
+
+    metrics = cache.metrics()
+    assert (metrics["hits"], metrics["disk_hits"], metrics["misses"]) == (1, 1, 2)
+    assert metrics["entries"] == 2
+    assert metrics["evictions"] == 1
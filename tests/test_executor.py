@@ -0,0 +1,74 @@
+"""Behavior tests for the bounded executor's operation classes"""
+import asyncio
+import threading
+
+import server
+
+
+def test_health_checks_do_not_queue_behind_busy_readers():
+    async def scenario():
+        executor = server.BlockingExecutor({"read": 2, "health": 1})
+        release = threading.Event()
+        readers = [asyncio.ensure_future(executor.run("read", release.wait)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        assert executor.metrics()["read"]["waiting"] == 1
+
+        assert await asyncio.wait_for(executor.run("health", lambda: "ok"), timeout=1) == "ok"
+        release.set()
+        await asyncio.gather(*readers)
+        executor.pool.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_every_tool_class_has_a_limit():
+    assert set(server.TOOL_OPERATION_CLASSES.values()) <= set(server.EXECUTOR_LIMITS)
+
+
+def test_exclusive_calls_drain_and_block_every_gated_class():
+    async def scenario():
+        executor = server.BlockingExecutor({"read": 2, "write": 1, "health": 1, "exclusive": 1}, ungated=("health",))
+        release_read = threading.Event()
+        order = []
+
+        def record(label):
+            order.append(label)
+            return label
+
+        in_flight_read = asyncio.ensure_future(executor.run("read", lambda: (release_read.wait(), record("read-1"))))
+        await asyncio.sleep(0.05)
+        migration = asyncio.ensure_future(executor.run("exclusive", record, "migrate"))
+        await asyncio.sleep(0.05)
+        later_read = asyncio.ensure_future(executor.run("read", record, "read-2"))
+        later_write = asyncio.ensure_future(executor.run("write", record, "write"))
+        await asyncio.sleep(0.05)
+
+        # The migration waits for the in-flight read; new reads and writes wait for the migration
+        assert order == []
+        assert executor.metrics()["exclusive"]["waiting"] == 1
+        assert await asyncio.wait_for(executor.run("health", record, "health"), timeout=1) == "health"
+
+        release_read.set()
+        await asyncio.gather(in_flight_read, migration, later_read, later_write)
+        assert order[:3] == ["health", "read-1", "migrate"]
+        assert sorted(order[3:]) == ["read-2", "write"]
+        executor.pool.shutdown()
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_exclusive_call_reopens_the_gate():
+    async def scenario():
+        executor = server.BlockingExecutor({"read": 1, "exclusive": 1})
+        release_read = threading.Event()
+        in_flight_read = asyncio.ensure_future(executor.run("read", release_read.wait))
+        await asyncio.sleep(0.05)
+        migration = asyncio.ensure_future(executor.run("exclusive", lambda: None))
+        await asyncio.sleep(0.05)
+        migration.cancel()
+        release_read.set()
+        await in_flight_read
+        assert await asyncio.wait_for(executor.run("read", lambda: "ok"), timeout=1) == "ok"
+        executor.pool.shutdown()
+
+    asyncio.run(scenario())
@@ -0,0 +1,81 @@
+"""Tests for the HyperLogLog unique tag estimator"""
+import json
+
+import pytest
+
+import server
+
+
+def test_hyperloglog_estimate_within_error_bound():
+    sketch = server.HyperLogLog(12)
+    for i in range(20000):
+        sketch.add(f"tag-{i}")
+        sketch.add(f"tag-{i}")
+    assert abs(sketch.estimate() - 20000) <= 20000 * 4 * sketch.relative_error
+
+
+def test_hyperloglog_small_counts_are_exact_enough():
+    sketch = server.HyperLogLog(12)
+    for tag in ("a", "b", "c", "a"):
+        sketch.add(tag)
+    assert sketch.estimate() == 3
+
+
+def test_hyperloglog_merge_and_round_trip():
+    left, right = server.HyperLogLog(10), server.HyperLogLog(10)
+    for i in range(1000):
+        left.add(i)
+    for i in range(500, 1500):
+        right.add(i)
+    left.merge(right)
+    restored = server.HyperLogLog.from_dict(json.loads(json.dumps(left.to_dict())))
+    assert restored.registers == left.registers
+    assert abs(restored.estimate() - 1500) <= 1500 * 4 * restored.relative_error
+
+
+def test_hyperloglog_add_reports_raised_registers():
+    sketch = server.HyperLogLog(10)
+    assert sketch.add("a")
+    assert not sketch.add("a")
+
+
+def test_hyperloglog_rejects_bad_precision_and_mismatched_merge():
+    with pytest.raises(ValueError):
+        server.HyperLogLog(3)
+    with pytest.raises(ValueError):
+        server.HyperLogLog(10).merge(server.HyperLogLog(11))
+
+
+def test_tag_sketch_rebuilds_once_deletes_pile_up(tmp_path, empty_collection, add_memories):
+    add_memories([(f"m{i}", "note", {"tags": json.dumps([f"tag-{i}"])}, [i, 1, 0, 0]) for i in range(10)])
+    sketch = server.TagSketch(str(tmp_path / "tag_sketch.json"), 10)
+    assert sketch.ensure_fresh(empty_collection)
+    assert sketch.unique_tags() == 10
+
+    empty_collection.delete(ids=["m0", "m1"])
+    sketch.remove_memories([{"tags": '["tag-0"]'}, {"tags": '["tag-1"]'}])
+    # Deletes cannot be subtracted from a sketch, so the estimate holds until a rebuild
+    assert sketch.unique_tags() == 10
+    assert sketch.ensure_fresh(empty_collection)
+    assert sketch.unique_tags() == 8
+    assert not sketch.ensure_fresh(empty_collection)
+
+
+def test_tag_sketch_persists_on_flush_or_every_n_writes(tmp_path, empty_collection, monkeypatch):
+    monkeypatch.setattr(server, "INDEX_COMPACT_EVERY", 3)
+    path = tmp_path / "tag_sketch.json"
+    sketch = server.TagSketch(str(path), 10)
+    sketch.ensure_fresh(empty_collection)
+    saved = path.read_text()
+
+    assert sketch.add_memory({"tags": ["a", "b"]}) == 2
+    assert sketch.add_memory({"tags": ["a"]}) == 0
+    assert path.read_text() == saved
+    sketch.remove_memories([{"tags": ["b"]}])  # third write reaches the threshold
+    assert json.loads(path.read_text())["total_memories"] == 1
+
+    sketch.add_memory({"tags": ["c"]})
+    sketch.flush()
+    restored = server.TagSketch(str(path), 10)
+    assert restored.load()
+    assert restored.snapshot() == (2, 3)
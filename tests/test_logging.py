@@ -0,0 +1,16 @@
+"""Tests for the JSON lines log formatter"""
+import json
+import logging
+import warnings
+
+import server
+
+
+def test_log_timestamp_is_utc_without_deprecation_warning():
+    record = logging.LogRecord("memory_dashboard", logging.INFO, __file__, 1, "stored", None, None)
+    record.created = 1717243200.25
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        entry = json.loads(server.JsonLinesFormatter().format(record))
+    assert entry["ts"] == "2024-06-01T12:00:00.250Z"
+    assert entry["msg"] == "stored"
@@ -0,0 +1,64 @@
+"""Behavior tests for HNSW collection migration against a temporary Chroma collection"""
+import asyncio
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def migratable(empty_collection, add_memories):
+    add_memories([
+        ("m1", "first", {"tags": '["a"]'}, [1, 0, 0, 0]),
+        ("m2", "second", {"tags": '["b"]'}, [0, 1, 0, 0]),
+        ("m3", "third", {"tags": '["a", "b"]'}, [0, 0, 1, 0]),
+    ])
+    return empty_collection
+
+
+def test_migration_copies_memories_and_swaps_the_collection(migratable):
+    version = server.get_collection_version()
+    result = server.migrate_collection({"space": "cosine", "search_ef": 50})
+
+    assert result["memories"] == 3
+    assert result["before"]["space"] == "l2"
+    assert result["after"] == {**result["before"], "space": "cosine", "search_ef": 50}
+    assert server.collection is not migratable
+    assert server.collection.name == server.COLLECTION_NAME
+    assert server.get_collection_version() > version
+    assert server.COLLECTION_NAME in [existing.name for existing in server.client.list_collections()]
+    assert server.MIGRATION_COLLECTION_NAME not in [existing.name for existing in server.client.list_collections()]
+
+    copied = server.collection.get(ids=["m3"], include=["embeddings", "documents", "metadatas"])
+    assert copied["documents"] == ["third"]
+    assert copied["metadatas"] == [{"tags": '["a", "b"]'}]
+    assert [float(value) for value in copied["embeddings"][0]] == [0.0, 0.0, 1.0, 0.0]
+    # Searches run against the new collection and its distance function
+    results = server.query_collection({"query_embeddings": [[0.0, 0.0, 2.0, 0.0]]}, 1, include=["distances"])
+    assert results["ids"] == [["m3"]]
+    assert results["distances"][0][0] == pytest.approx(0.0, abs=1e-5)
+
+
+def test_rejects_unknown_settings(migratable):
+    with pytest.raises(ValueError):
+        server.migrate_collection({"space": "manhattan"})
+    assert server.collection is migratable
+
+
+def test_open_collection_finishes_an_interrupted_migration(migratable):
+    data = migratable.get(include=["embeddings", "documents", "metadatas"])
+    interrupted = server.client.create_collection(name=server.MIGRATION_COLLECTION_NAME, metadata={"hnsw:search_ef": 40})
+    interrupted.add(ids=data["ids"], embeddings=data["embeddings"], documents=data["documents"], metadatas=data["metadatas"])
+    server.client.delete_collection(server.COLLECTION_NAME)  # crash right after dropping the old collection
+
+    # The dropped collection is gone for good, so the reopened one stays for later tests
+    server.collection = server.open_collection()
+    assert server.collection.name == server.COLLECTION_NAME
+    assert server.collection.count() == 3
+    assert server.get_hnsw_settings(server.collection)["search_ef"] == 40
+
+
+def test_migration_and_benchmark_tools_share_the_hnsw_settings_schema():
+    tools = {tool.name: tool.inputSchema["properties"] for tool in asyncio.run(server.handle_list_tools())}
+    assert tools["dashboard_migrate_collection"] == server.HNSW_SETTING_PROPERTIES
+    assert tools["dashboard_benchmark_hnsw"]["settings"]["items"]["properties"] == server.HNSW_SETTING_PROPERTIES
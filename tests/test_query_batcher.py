@@ -0,0 +1,58 @@
+"""Tests for coalescing concurrent semantic searches into batched queries"""
+import asyncio
+
+import numpy as np
+import pytest
+
+import server
+
+
+@pytest.fixture
+def batch_memories(empty_collection, add_memories, monkeypatch):
+    add_memories([
+        ("north", "north note", {"tags": '["a"]'}, [1, 0, 0, 0]),
+        ("east", "east note", {"tags": '["a"]'}, [0, 1, 0, 0]),
+        ("up", "up note", {"tags": '["b"]'}, [0, 0, 1, 0]),
+    ])
+    for query_text, vector in (("go north", [1, 0, 0, 0]), ("go east", [0, 1, 0, 0]), ("go up", [0, 0, 1, 0])):
+        server.embedding_cache._remember(server.normalize_query(query_text), np.asarray(vector, dtype=np.float32))
+    # A fresh executor, so its semaphores and events belong to this test's event loop
+    monkeypatch.setattr(server, "blocking_executor", server.BlockingExecutor(server.EXECUTOR_LIMITS, ungated=("health",)))
+
+
+def test_concurrent_searches_are_coalesced_and_fanned_out(batch_memories):
+    batcher = server.QueryBatcher(window_ms=50, max_batch_size=32)
+
+    async def scenario():
+        return await asyncio.gather(
+            batcher.search("go north", 1),
+            batcher.search("go east", 2),
+            batcher.search("go up", 1),
+            batcher.search("go north", 1, tag_filter={"tags": ["b"], "mode": "any"}),
+        )
+
+    north, east, up, north_in_b = asyncio.run(scenario())
+    assert [memory["id"] for memory in north] == ["north"]
+    assert [memory["id"] for memory in east][0] == "east" and len(east) == 2
+    assert [memory["id"] for memory in up] == ["up"]
+    assert [memory["id"] for memory in north_in_b] == ["up"]
+    # One batch for the unfiltered queries, one for the tag-filtered query
+    assert batcher.counters["batches"] == 2
+    assert batcher.counters["queries"] == 4
+    assert batcher.counters["max_batch_size_seen"] == 3
+    assert not batcher._tasks
+
+
+def test_a_failed_batch_fails_every_waiting_caller(batch_memories, monkeypatch):
+    batcher = server.QueryBatcher(window_ms=50, max_batch_size=32)
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("query failed")
+
+    monkeypatch.setattr(server, "run_semantic_search_batch", broken)
+
+    async def scenario():
+        return await asyncio.gather(batcher.search("go north", 1), batcher.search("go east", 1), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert [str(result) for result in results] == ["query failed", "query failed"]
@@ -0,0 +1,216 @@
+"""Behavior tests for semantic, lexical and filtered search against a temporary Chroma collection"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+import server
+
+
+# Search result cache version
+
+def test_cache_version_reuses_the_count_until_it_expires(empty_collection, add_memories):
+    version = server.get_search_cache_version()
+    # An external writer (another process) adds a memory behind our back
+    add_memories([("ext", "external", {"type": "note"}, [1, 0, 0, 0])])
+    assert server.get_search_cache_version() == version
+
+    server.server_cache.expire("collection", "count")
+    assert server.get_search_cache_version() == (version[0], version[1] + 1)
+
+
+def test_own_writes_refresh_the_cached_count(empty_collection, add_memories):
+    server.get_search_cache_version()
+    add_memories([("m1", "mine", {"type": "note"}, [1, 0, 0, 0])])
+    server.bump_collection_version()
+    assert server.get_search_cache_version() == (server.get_collection_version(), 1)
+
+
+# BM25 lexical index and reciprocal rank fusion
+
+@pytest.fixture
+def lexical_memories(empty_collection, add_memories):
+    add_memories([
+        ("m1", "ERR_CONN_RESET while calling the payments API", {"tags": '["bug"]'}, [1, 0, 0, 0]),
+        ("m2", "payments retry policy and payments backoff", {"tags": '["design"]'}, [0, 1, 0, 0]),
+        ("m3", "notes about the weekly planning meeting", {"tags": '["meeting"]'}, [0, 0, 1, 0]),
+    ])
+
+
+def test_bm25_ranks_by_term_frequency_and_keeps_identifiers_whole(lexical_memories):
+    assert [memory_id for memory_id, _ in server.run_lexical_search("payments", 3)] == ["m2", "m1"]
+    assert [memory_id for memory_id, _ in server.run_lexical_search("err_conn_reset", 3)] == ["m1"]
+    assert server.run_lexical_search("conn", 3) == []
+
+
+def test_bm25_index_follows_deletes_and_external_writes(lexical_memories, add_memories):
+    server.run_lexical_search("payments", 3)
+    server.lexical_index.remove_documents(["m2"])
+    assert [memory_id for memory_id, _ in server.lexical_index.search("payments", 3)] == ["m1"]
+
+    # Another process added a memory: the count no longer matches, so the index rebuilds
+    add_memories([("m4", "payments dashboard", {"tags": '["ui"]'}, [0, 0, 0, 1])])
+    assert {memory_id for memory_id, _ in server.run_lexical_search("payments", 5)} == {"m1", "m2", "m4"}
+
+
+def test_lexical_search_honours_tag_filters(lexical_memories):
+    assert server.run_lexical_search_filtered("payments", 3, tag_filter={"tags": ["bug"], "mode": "any"}) == ["m1"]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = server.reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+    assert [memory_id for memory_id, _ in fused] == ["b", "a", "d", "c"]
+    assert fused[0][1] == pytest.approx(1 / 62 + 1 / 61)
+
+
+@pytest.mark.parametrize("mode", ["lexical", "hybrid"])
+@pytest.mark.parametrize("option", [{"rerank": True}, {"min_similarity": 0.5}, {"dedup_threshold": 0.9}, {"mmr_lambda": 0.5}])
+def test_rerank_options_are_rejected_outside_vector_mode(mode, option):
+    with pytest.raises(ValueError, match="only supported in vector mode"):
+        asyncio.run(server.retrieve_memories("query", {"mode": mode, **option}))
+
+
+# Exact re-ranking, MMR and similarity cutoffs
+
+def seed_query(query_text, vector):
+    """Put a query's embedding in the memo cache so searches never load the embedding model"""
+    server.embedding_cache._remember(server.normalize_query(query_text), np.asarray(vector, dtype=np.float32))
+
+
+@pytest.fixture
+def rerank_memories(empty_collection, add_memories):
+    add_memories([
+        ("m1", "original", {"tags": '["a"]'}, [1, 0, 0, 0]),
+        ("m2", "near copy", {"tags": '["a"]'}, [0.99, 0.1, 0, 0]),
+        ("m3", "related", {"tags": '["b"]'}, [0.7, 0.7, 0, 0]),
+        ("m4", "unrelated", {"tags": '["b"]'}, [0, 0, 1, 0]),
+    ])
+    seed_query("rerank query", [1, 0.05, 0, 0])
+
+
+def test_rerank_reports_exact_cosine_similarity(rerank_memories):
+    memories = server.run_reranked_search("rerank query", 4)
+    assert [memory["id"] for memory in memories] == ["m1", "m2", "m3", "m4"]
+    query = np.array([1, 0.05, 0, 0]) / np.linalg.norm([1, 0.05, 0, 0])
+    assert memories[2]["similarity"] == pytest.approx(float(query @ (np.array([0.7, 0.7, 0, 0]) / np.linalg.norm([0.7, 0.7, 0, 0]))), abs=1e-5)
+
+
+def test_rerank_drops_results_below_min_similarity(rerank_memories):
+    memories = server.run_reranked_search("rerank query", 4, min_similarity=0.5)
+    assert [memory["id"] for memory in memories] == ["m1", "m2", "m3"]
+
+
+def test_mmr_trades_relevance_for_diversity(rerank_memories):
+    relevant = server.run_reranked_search("rerank query", 2, mmr_lambda=1.0)
+    diverse = server.run_reranked_search("rerank query", 2, mmr_lambda=0.3)
+    assert [memory["id"] for memory in relevant] == ["m1", "m2"]
+    assert diverse[0]["id"] == "m1"
+    assert diverse[1]["id"] != "m2"
+
+
+def test_mmr_select_prefers_unseen_directions():
+    similarities = np.array([0.9, 0.89, 0.5], dtype=np.float32)
+    pairwise = np.array([[1.0, 0.99, 0.0], [0.99, 1.0, 0.0], [0.0, 0.0, 1.0]], dtype=np.float32)
+    assert server.mmr_select(similarities, pairwise, 2, 1.0) == [0, 1]
+    assert server.mmr_select(similarities, pairwise, 2, 0.5) == [0, 2]
+
+
+# Filters pushed into the query: timestamp_epoch backfill and allowed_ids
+
+def test_backfill_makes_memories_without_timestamp_epoch_visible_to_time_filters(empty_collection, add_memories):
+    recent = datetime.now(timezone.utc) - timedelta(days=1)
+    add_memories([
+        ("iso", "stored by another client", {"timestamp": recent.replace(tzinfo=None).isoformat()}, [1, 0, 0, 0]),
+        ("numeric", "numeric timestamp", {"timestamp": recent.timestamp()}, [0, 1, 0, 0]),
+        ("old", "years ago", {"timestamp": "2020-01-01T00:00:00"}, [0, 0, 1, 0]),
+        ("untimed", "no timestamp", {"type": "note"}, [0, 0, 0, 1]),
+    ])
+    assert server.recall_page("recall_memory", {"query": "last week"})["memories"] == []
+
+    assert server.backfill_timestamp_epoch(empty_collection) == 3
+    assert server.backfill_timestamp_epoch(empty_collection) == 0
+    metadata = empty_collection.get(ids=["iso"], include=["metadatas"])["metadatas"][0]
+    assert metadata["timestamp_epoch"] == pytest.approx(recent.timestamp(), abs=1e-3)
+
+    page = server.recall_page("recall_memory", {"query": "last week", "limit": 10})
+    assert sorted(memory["id"] for memory in page["memories"]) == ["iso", "numeric"]
+
+
+def test_time_bounds_accept_iso_strings_and_epoch_seconds():
+    where, _ = server.build_search_filter({"after": "2025-01-01", "before": 1767225600})
+    assert where == {"$and": [
+        {"timestamp_epoch": {"$gte": 1735689600.0}},
+        {"timestamp_epoch": {"$lt": 1767225600.0}},
+    ]}
+    with pytest.raises(ValueError):
+        server.build_search_filter({"after": "last tuesday"})
+
+
+@pytest.fixture
+def filter_memories(empty_collection, add_memories):
+    add_memories([
+        (f"m{i}", f"memory {i}", {"tags": '["even"]' if i % 2 == 0 else '["odd"]', "rank": i}, [1, i / 10, 0, 0])
+        for i in range(10)
+    ])
+
+
+def query_ids(allowed_ids, where=None, n_results=3):
+    results = server.query_collection({"query_embeddings": [[1.0, 0.0, 0.0, 0.0]]}, n_results, where, ["distances"], allowed_ids)
+    return results["ids"][0], results["distances"][0]
+
+
+def test_query_collection_restricts_results_to_allowed_ids(filter_memories, monkeypatch):
+    allowed = server.resolve_tag_filter({"tags": ["odd"], "mode": "any"})
+    exact_ids, exact_distances = query_ids(allowed)
+    assert exact_ids == ["m1", "m3", "m5"]
+
+    # Above TAG_FILTER_EXACT_MAX the ANN index is over-fetched and filtered instead
+    monkeypatch.setattr(server, "TAG_FILTER_EXACT_MAX", 0)
+    ann_ids, ann_distances = query_ids(allowed)
+    assert ann_ids == exact_ids
+    assert ann_distances == pytest.approx(exact_distances, abs=1e-4)
+
+
+def test_query_collection_combines_allowed_ids_with_where(filter_memories, monkeypatch):
+    allowed = server.resolve_tag_filter({"tags": ["even"], "mode": "any"})
+    where = {"rank": {"$gte": 4}}
+    assert query_ids(allowed, where)[0] == ["m4", "m6", "m8"]
+    monkeypatch.setattr(server, "TAG_FILTER_EXACT_MAX", 0)
+    assert query_ids(allowed, where)[0] == ["m4", "m6", "m8"]
+    assert query_ids(set())[0] == []
+
+
+def test_search_tools_share_filter_and_projection_schemas():
+    tools = {tool.name: tool.inputSchema["properties"] for tool in asyncio.run(server.handle_list_tools())}
+    for name in ("retrieve_memory", "dashboard_retrieve_memory", "retrieve_memory_batch"):
+        assert server.SEARCH_FILTER_PROPERTIES.items() <= tools[name].items()
+        assert server.PROJECTION_PROPERTIES.items() <= tools[name].items()
+    assert tools["retrieve_memory"] == tools["dashboard_retrieve_memory"]
+
+
+# Near-duplicate suppression
+
+def test_dedup_widens_the_candidate_pool_until_enough_distinct_hits(empty_collection, add_memories):
+    add_memories(
+        [(f"dup{i}", f"same note, take {i}", {"tags": '["dup"]'}, [1, 0.01 * i, 0, 0]) for i in range(10)]
+        + [("distinct", "another topic", {"tags": '["other"]'}, [0.5, 0, 0.87, 0])]
+    )
+    seed_query("dedup query", [1, 0, 0, 0])
+
+    # The first fetch (n_results * RERANK_OVERFETCH = 8) holds only copies of one note
+    memories = server.run_reranked_search("dedup query", 2, dedup_threshold=0.95)
+    assert [memory["id"] for memory in memories] == ["dup0", "distinct"]
+    assert memories[0]["duplicate_count"] == 9
+    assert sorted(memories[0]["duplicate_ids"]) == [f"dup{i}" for i in range(1, 10)]
+    assert memories[1]["duplicate_count"] == 0
+
+
+def test_cluster_duplicates_claims_members_once():
+    pairwise = np.array([
+        [1.0, 0.97, 0.96, 0.1],
+        [0.97, 1.0, 0.99, 0.1],
+        [0.96, 0.99, 1.0, 0.1],
+        [0.1, 0.1, 0.1, 1.0],
+    ], dtype=np.float32)
+    assert server.cluster_duplicates(range(4), pairwise, 0.95) == {0: [1, 2], 3: []}
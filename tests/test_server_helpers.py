@@ -0,0 +1,44 @@
+"""Unit tests for the pure helpers in server.py (no Chroma queries involved)"""
+import server
+
+
+# make_snippet
+
+def test_snippet_returns_short_content_unchanged():
+    assert server.make_snippet("short note", "note", 80) == "short note"
+
+
+def test_snippet_keeps_match_near_the_end():
+    content = "intro " * 50 + "the final ERR_CONN_RESET"
+    snippet = server.make_snippet(content, "ERR_CONN_RESET", 80)
+    assert "ERR_CONN_RESET" in snippet
+    assert snippet.startswith("…")
+    assert len(snippet) <= 80
+
+
+def test_snippet_keeps_match_that_ends_on_the_window_edge():
+    content = "lorem ipsum dolor " * 20 + "needle_term_here" + " trailing words" * 20
+    for max_length in range(20, 120, 7):
+        snippet = server.make_snippet(content, "needle_term_here", max_length)
+        assert "needle_term_here" in snippet, max_length
+        assert len(snippet) <= max_length, max_length
+
+
+def test_snippet_never_exceeds_max_length():
+    content = "alpha beta gamma delta " * 40
+    for query in (None, "gamma", "alpha delta", "missing"):
+        for max_length in (1, 2, 3, 10, 33, 80, 200):
+            assert len(server.make_snippet(content, query, max_length)) <= max_length
+
+
+def test_snippet_prefers_window_with_most_distinct_terms():
+    content = "cache " + "filler " * 40 + "cache eviction policy" + " filler" * 40
+    snippet = server.make_snippet(content, "cache eviction", 60)
+    assert "cache eviction" in snippet
+
+
+def test_snippet_without_query_is_leading_excerpt():
+    content = "first words of a long memory " * 10
+    snippet = server.make_snippet(content, None, 40)
+    assert snippet.startswith("first words")
+    assert snippet.endswith("…")
@@ -0,0 +1,93 @@
+"""Behavior tests for stats computation and in-place cache deltas"""
+import pytest
+
+import server
+
+
+@pytest.fixture
+def cached_stats(empty_collection, add_memories):
+    add_memories([
+        ("m1", "first", {"tags": '["a", "b"]'}, [1, 0, 0, 0]),
+        ("m2", "second", {"tags": '["b"]'}, [0, 1, 0, 0]),
+    ])
+    return server.compute_stats()
+
+
+def store(memory_id, tags):
+    metadata = {"tags": tags}
+    server.collection.add(ids=[memory_id], documents=[memory_id], metadatas=[metadata], embeddings=[[0.0, 0.0, 1.0, 0.0]])
+    server.record_memory_stored(memory_id, memory_id, metadata)
+
+
+def cached_summary():
+    return server.server_cache.get("stats", "summary")
+
+
+def test_store_and_delete_patch_cached_stats(cached_stats):
+    assert (cached_stats["total_memories"], cached_stats["unique_tags"]) == (2, 2)
+
+    store("m3", '["c"]')
+    assert (cached_summary()["total_memories"], cached_summary()["unique_tags"]) == (3, 3)
+
+    server.collection.delete(ids=["m1"])
+    server.record_memories_deleted(["m1"], [{"tags": '["a", "b"]'}])
+    assert (cached_summary()["total_memories"], cached_summary()["unique_tags"]) == (2, 2)
+    assert server.server_cache.metrics()["namespaces"]["stats"]["deltas"] >= 2
+
+
+def test_drift_from_the_tag_index_drops_the_entry(cached_stats):
+    # The index sees a write the cached stats never heard about
+    server.tag_index.add_memory({"tags": ["z"]})
+    server.update_cached_stats(1, new_tags=0)
+    assert server.server_cache.get_stale("stats", "summary") is None
+
+
+def test_unknown_tag_delta_drops_api_stats(cached_stats):
+    server.update_cached_stats(1, new_tags=None)
+    assert server.server_cache.get_stale("stats", "summary") is None
+
+
+def test_last_scan_only_reported_by_the_computation_that_scanned(cached_stats):
+    assert cached_stats["last_scan"]["rows"] == 2
+
+    server.collection.delete(ids=["m2"])
+    server.record_memories_deleted(["m2"], [{"tags": '["b"]'}])
+    assert cached_summary()["total_memories"] == 1
+    assert "last_scan" not in cached_summary()
+
+    assert "last_scan" not in server.compute_stats()
+
+
+@pytest.fixture
+def sqlite_stats(empty_collection, add_memories, monkeypatch):
+    monkeypatch.setattr(server, "STATS_SQL_FASTPATH", True)
+    add_memories([
+        ("m1", "first", {"tags": '["a", "b"]'}, [1, 0, 0, 0]),
+        ("m2", "second", {"tags": '["b", 7]'}, [0, 1, 0, 0]),
+        ("m3", "third", {"tags": "not json"}, [0, 0, 1, 0]),
+    ])
+    return server.compute_stats()
+
+
+def test_sqlite_stats_count_only_string_tags(sqlite_stats):
+    assert sqlite_stats == {"total_memories": 3, "unique_tags": 2, "unique_tags_method": "sqlite"}
+    assert server.get_stats_from_sqlite() == sqlite_stats
+
+
+def test_sqlite_stats_disabled_or_unsupported_schema_fall_back(sqlite_stats, monkeypatch):
+    monkeypatch.setattr(server, "SUPPORTED_CHROMA_SCHEMA", {"sysdb": 0, "metadb": 0})
+    assert server.get_stats_from_sqlite() is None
+    monkeypatch.setattr(server, "STATS_SQL_FASTPATH", False)
+    assert server.get_stats_from_sqlite() is None
+
+
+def test_sqlite_stats_take_known_deltas_without_drift_check(sqlite_stats):
+    server.update_cached_stats(1, new_tags=2)
+    assert server.server_cache.get("stats", "summary")["unique_tags"] == 4
+
+
+def test_sqlite_stats_with_unknown_tag_delta_are_served_stale(sqlite_stats):
+    server.update_cached_stats(-1, dropped_tags=None)
+    assert server.server_cache.get("stats", "summary") is None
+    stale = server.server_cache.get_stale("stats", "summary")
+    assert (stale["total_memories"], stale["unique_tags"]) == (2, 2)
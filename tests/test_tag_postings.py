@@ -0,0 +1,45 @@
+"""Behavior tests for tag search and delete_by_tag through the tag postings index"""
+import pytest
+
+import server
+
+
+@pytest.fixture
+def tagged(empty_collection, add_memories):
+    add_memories([
+        ("m1", "first", {"tags": '["a", "b"]'}, [1, 0, 0, 0]),
+        ("m2", "second", {"tags": '["b"]'}, [0, 1, 0, 0]),
+        ("m3", "third", {"tags": '["ab", "c"]'}, [0, 0, 1, 0]),
+    ])
+    server.tag_index.ensure_fresh(empty_collection)
+    return empty_collection
+
+
+def tag_search(**arguments):
+    return sorted(memory["id"] for memory in server.search_by_tag_page("search_by_tag", arguments)["memories"])
+
+
+def test_search_by_tag_matches_whole_tags_only(tagged):
+    assert tag_search(tags=["a"]) == ["m1"]
+    assert tag_search(tags=["b", "c"]) == ["m1", "m2", "m3"]
+    assert tag_search(tags=["missing"]) == []
+
+
+def test_delete_by_tag_removes_tagged_memories_and_updates_indexes(tagged):
+    result = server.call_tool_sync("delete_by_tag", {"tag": "b"})
+    assert result[0].text == "Successfully deleted 2 memories with tag: b"
+    assert tagged.get(include=[])["ids"] == ["m3"]
+    assert server.tag_index.get_counts() == {"ab": 1, "c": 1}
+    assert tag_search(tags=["a", "b"]) == []
+
+    result = server.call_tool_sync("delete_by_tag", {"tag": "b"})
+    assert result[0].text == "No memories found with tag: b"
+
+
+def test_delete_by_tag_skips_memories_whose_tags_changed(tagged):
+    tag_search(tags=["a"])  # build the postings index
+    tagged.update(ids=["m1"], metadatas=[{"tags": '["z"]'}])  # retagged by another process
+    result = server.call_tool_sync("delete_by_tag", {"tag": "a"})
+    assert result[0].text == "No memories found with tag: a"
+    assert tagged.count() == 3
+    assert tag_search(tags=["z"]) == ["m1"]
@@ -0,0 +1,71 @@
+"""Tests for the boolean tag query parser and its evaluation over the tag postings index"""
+import pytest
+
+import server
+
+
+def test_parse_tag_query_precedence():
+    assert server.parse_tag_query("a OR b AND NOT c") == (
+        "or", [("tag", "a"), ("and", [("tag", "b"), ("not", ("tag", "c"))])]
+    )
+
+
+def test_parse_tag_query_implicit_and_and_quotes():
+    assert server.parse_tag_query('project-x "needs review" NOT resolved') == (
+        "and", [("tag", "project-x"), ("tag", "needs review"), ("not", ("tag", "resolved"))]
+    )
+
+
+def test_parse_tag_query_parentheses():
+    assert server.parse_tag_query("(a OR b) AND c") == (
+        "and", [("or", [("tag", "a"), ("tag", "b")]), ("tag", "c")]
+    )
+
+
+@pytest.mark.parametrize("query", ["", "   ", "a AND", "(a OR b", "a)", "AND a", "NOT"])
+def test_parse_tag_query_rejects_malformed_input(query):
+    with pytest.raises(ValueError):
+        server.parse_tag_query(query)
+
+
+@pytest.fixture
+def postings():
+    index = server.TagPostingsIndex()
+    index.loaded = True
+    index.add_memory("m1", {"tags": ["a", "b"]})
+    index.add_memory("m2", {"tags": '["b", "c"]'})
+    index.add_memory("m3", {"tags": ["a", "c"]})
+    index.add_memory("m4", {"tags": []})
+    return index
+
+
+def matching_ids(query, index):
+    return set(index.resolve(server.evaluate_tag_query(server.parse_tag_query(query), index)))
+
+
+def test_evaluate_tag_query(postings):
+    assert matching_ids("a", postings) == {"m1", "m3"}
+    assert matching_ids("a OR c", postings) == {"m1", "m2", "m3"}
+    assert matching_ids("b AND c", postings) == {"m2"}
+    assert matching_ids("a NOT b", postings) == {"m3"}
+    assert matching_ids("NOT a", postings) == {"m2", "m4"}
+    assert matching_ids("(a OR b) AND NOT c", postings) == {"m1"}
+    assert matching_ids("unknown", postings) == set()
+
+
+def test_evaluate_tag_query_skips_deleted_memories(postings):
+    postings.remove_memories(["m1"], [{"tags": ["a", "b"]}])
+    assert matching_ids("a OR b", postings) == {"m2", "m3"}
+    assert matching_ids("NOT c", postings) == {"m4"}
+
+
+def test_tag_query_search_over_the_collection(empty_collection, add_memories):
+    add_memories([
+        ("bug-open", "crash on save", {"tags": '["project-x", "bug"]'}, [1, 0, 0, 0]),
+        ("bug-fixed", "crash on load", {"tags": '["project-x", "bug", "resolved"]'}, [0, 1, 0, 0]),
+        ("idea", "dark mode", {"tags": '["project-x", "needs review"]'}, [0, 0, 1, 0]),
+    ])
+    page = server.search_by_tag_page("search_by_tag", {"tag_query": 'project-x bug NOT resolved OR "needs review"'})
+    assert sorted(memory["id"] for memory in page["memories"]) == ["bug-open", "idea"]
+    with pytest.raises(ValueError):
+        server.search_by_tag_page("search_by_tag", {"tag_query": "bug AND"})